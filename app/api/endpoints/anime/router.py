@@ -1,34 +1,67 @@
 from typing_extensions import Annotated, Doc
-from random import randint
 
-from fastapi import APIRouter, status, Depends, Cookie
+import asyncio
+
+from fastapi import APIRouter, status, Depends, Cookie, Query, Request
+from fastapi.responses import StreamingResponse
 from fastapi.exceptions import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.schemas.anime import AnimeResponse, AnimeResponseBase, AnimeUpdate, AnimeCreate
-from app.core.db import get_async_session
+from app.core.schemas.anime import (
+    AnimeResponse,
+    AnimeResponseBase,
+    AnimeCardResponse,
+    AnimeCardResponseBase,
+    AnimeUpdate,
+    AnimeCreate,
+    AnimeSuggestResponseBase,
+    AnimeBulkItem,
+)
+from app.core.db import get_async_session, get_async_read_session
 from app.core.controllers.anime import anime_crud
+from app.core.controllers.rating import rating_crud
 from app.core.mapper import BaseResponseDataMapper
-from app.core.filters.anime import AnimeFilter
+from app.core.filters.anime import AnimeFilter, AnimeChartFilter, AnimeRandomFilter
+from app.core.cache import CachedRoute, cache_response, response_cache
 from app.core.security import verify_access_token, validate_permission
 from app.core.controllers.comment import comment_crud
-from app.core.schemas.comment import CommentCreate, CommentResponse
+from app.core.schemas.comment import (
+    CommentCreate,
+    CommentResponse,
+    CommentThreadResponse,
+)
+from app.core.schemas.rating import UserRatingScore
+from app.core.filters.comment import CommentThreadFilter, CommentReplyFilter
+from app.core.suggest import suggest_index
+from app.core.serializers import fast_response
+from app.core.bulk import bulk_upsert_ndjson
+from app.core.streams import comment_hub
+from app.core.settings import settings
+from app.core.tasks import run_in_background, rebuild_similar
 
-router: APIRouter = APIRouter()
+router: APIRouter = APIRouter(route_class=CachedRoute)
 
 
 @router.get(
     "/",
-    response_model=AnimeResponse,
+    response_model=AnimeResponse | AnimeCardResponse,
     status_code=status.HTTP_200_OK,
 )
+@cache_response("anime")
 async def get_all_anime(
-    session: Annotated[AsyncSession, Depends(get_async_session)],
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
     filter: AnimeFilter = Depends()
 ):
 
+    schema = AnimeCardResponse if filter.view == "card" else AnimeResponse
+    if filter.pagination == "cursor":
+        anime, total, next_cursor = await anime_crud.get_all_by_cursor(session=session, filter=filter)
+        return fast_response(schema, BaseResponseDataMapper(anime, limit=filter.limit, total=total,
+                                                            total_strategy=filter.total_strategy,
+                                                            next_cursor=next_cursor).result_schema)
     anime, total = await anime_crud.get_all(session=session, filter=filter)
-    return BaseResponseDataMapper(anime, total=total).result_schema
+    return fast_response(schema, BaseResponseDataMapper(anime, total=total,
+                                                        total_strategy=filter.total_strategy).result_schema)
 
 
 @router.get(
@@ -37,23 +70,103 @@ async def get_all_anime(
     status_code=status.HTTP_200_OK,
 )
 async def get_random_anime(
-    session: Annotated[AsyncSession, Depends(get_async_session)],
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
+    filter: AnimeRandomFilter = Depends(),
+):
+    anime = await anime_crud.get_random(session=session, filter=filter)
+    if not anime:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Anime not found")
+    return anime[0]
+
+
+@router.get(
+    "/random/list",
+    response_model=list[AnimeResponseBase],
+    status_code=status.HTTP_200_OK,
+)
+async def get_random_anime_list(
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
+    filter: AnimeRandomFilter = Depends(),
+    count: Annotated[int, Query(ge=1, le=20, description="count")] = 10,
 ):
-    obj_id = randint(1, 8500)
-    anime = await anime_crud.get_by_id(session=session, obj_id=obj_id)
+    anime = await anime_crud.get_random(session=session, filter=filter, count=count)
     return anime
 
 
+@router.get(
+    "/suggest",
+    response_model=list[AnimeSuggestResponseBase],
+    status_code=status.HTTP_200_OK,
+)
+async def get_suggest_anime(
+    query: Annotated[str, Query(min_length=1, max_length=200, description="query")],
+    limit: Annotated[int, Query(ge=1, le=20, description="limit")] = 10,
+):
+    return suggest_index.search(query, limit=limit)
+
+
 @router.get(
     "/chart",
     response_model=list[AnimeResponseBase],
     status_code=status.HTTP_200_OK,
 )
+@cache_response("chart")
 async def get_chart_anime(
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
+    filter: AnimeChartFilter = Depends(),
+):
+    anime = await anime_crud.get_chart(session=session, filter=filter)
+    return fast_response(AnimeResponseBase, anime)
+
+
+@router.post(
+    "/chart/refresh",
+    status_code=status.HTTP_200_OK,
+)
+async def refresh_chart_anime(
     session: Annotated[AsyncSession, Depends(get_async_session)],
+    access_token: str | None = Cookie(default=None),
 ):
-    anime = await anime_crud.get_chart(session=session)
-    return anime
+    user_id = verify_access_token(access_token)
+    await validate_permission(user_id, "admin", session)
+    refreshed = await anime_crud.refresh_chart(session=session)
+    if refreshed:
+        await response_cache.invalidate("chart")
+    return {"status": "ok" if refreshed else "in progress"}
+
+
+@router.post(
+    "/ratings/recompute",
+    status_code=status.HTTP_200_OK,
+)
+async def recompute_ratings_anime(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    chunk_size: Annotated[int | None, Query(ge=1, le=10000)] = None,
+    access_token: str | None = Cookie(default=None),
+):
+    user_id = verify_access_token(access_token)
+    await validate_permission(user_id, "admin", session)
+    report = await rating_crud.recompute_avg_rating(session=session, chunk_size=chunk_size)
+    if report["updated"]:
+        await anime_crud.refresh_chart(session=session)
+        await response_cache.invalidate(*rating_crud.cache_namespaces)
+    return report
+
+
+@router.post(
+    "/similar/rebuild",
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def rebuild_similar_anime(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    access_token: str | None = Cookie(default=None),
+):
+    """
+    Start a full rebuild of similar anime in the background, `started` is false while one is running.
+    """
+    user_id = verify_access_token(access_token)
+    await validate_permission(user_id, "admin", session)
+    return {"started": run_in_background("similar", rebuild_similar)}
 
 
 @router.get(
@@ -61,12 +174,69 @@ async def get_chart_anime(
     response_model=AnimeResponseBase,
     status_code=status.HTTP_200_OK,
 )
+@cache_response("anime")
 async def get_by_id_anime(
-    session: Annotated[AsyncSession, Depends(get_async_session)],
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
     id: Annotated[int, Doc("Anime ID.")],
 ):
     anime = await anime_crud.get_by_id(session=session, obj_id=id)
-    return anime
+    return fast_response(AnimeResponseBase, anime)
+
+
+@router.get(
+    "/{id}/similar",
+    response_model=list[AnimeCardResponseBase],
+    status_code=status.HTTP_200_OK,
+)
+@cache_response("anime")
+async def get_by_id_anime_similar(
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
+    id: Annotated[int, Doc("Anime ID.")],
+    limit: Annotated[int, Query(ge=1, le=settings.similar_top_k)] = 10,
+):
+    anime = await anime_crud.get_similar(session=session, id=id, limit=limit)
+    return fast_response(AnimeCardResponseBase, anime)
+
+
+@router.get(
+    "/{id}/rating",
+    status_code=status.HTTP_200_OK,
+)
+async def get_by_id_anime_user_rating(
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
+    id: Annotated[int, Doc("Anime ID.")],
+):
+    return await rating_crud.get_user_stats(session=session, anime_id=id)
+
+
+@router.put(
+    "/{id}/rating",
+    status_code=status.HTTP_200_OK,
+)
+async def put_by_id_anime_user_rating(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    id: Annotated[int, Doc("Anime ID.")],
+    data: UserRatingScore,
+    access_token: str | None = Cookie(default=None),
+):
+    user_id = verify_access_token(access_token)
+    stats = await rating_crud.rate(session=session, user_id=user_id, anime_id=id, score=data.score)
+    if stats is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Anime not found")
+    return stats
+
+
+@router.delete(
+    "/{id}/rating",
+    status_code=status.HTTP_200_OK,
+)
+async def delete_by_id_anime_user_rating(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    id: Annotated[int, Doc("Anime ID.")],
+    access_token: str | None = Cookie(default=None),
+):
+    user_id = verify_access_token(access_token)
+    return await rating_crud.rate(session=session, user_id=user_id, anime_id=id, score=None)
 
 
 @router.get(
@@ -75,7 +245,7 @@ async def get_by_id_anime(
     status_code=status.HTTP_200_OK,
 )
 async def get_by_id_anime_comments(
-    session: Annotated[AsyncSession, Depends(get_async_session)],
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
     id: Annotated[int, Doc("Anime ID.")],
 ):
     comments, total = await comment_crud.get_all_by_attribute(attr_name="anime_id", attr_value=id, session=session)
@@ -83,6 +253,73 @@ async def get_by_id_anime_comments(
     return BaseResponseDataMapper(comments, total=total).result_schema
 
 
+@router.get(
+    "/{id}/comments/threads",
+    response_model=CommentThreadResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_by_id_anime_comment_threads(
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
+    id: Annotated[int, Doc("Anime ID.")],
+    filter: CommentThreadFilter = Depends(),
+):
+    threads, next_cursor = await comment_crud.get_threads(session=session, anime_id=id, filter=filter)
+    return fast_response(CommentThreadResponse, BaseResponseDataMapper(
+        threads, limit=filter.limit, total=None, next_cursor=next_cursor
+    ).result_schema)
+
+
+@router.get(
+    "/{id}/comments/stream",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def stream_by_id_anime_comments(
+    id: Annotated[int, Doc("Anime ID.")],
+):
+    """
+    Server-sent events with every new comment of the anime. Takes no database session,
+    so open streams do not hold pool connections.
+    """
+    subscription = comment_hub.subscribe(id)
+
+    async def events():
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), settings.comment_stream_heartbeat)
+                except asyncio.TimeoutError:
+                    event = b":\n\n"
+                if event is None:
+                    return
+                yield event
+        finally:
+            comment_hub.unsubscribe(id, subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/comment/{comment_id}/replies",
+    response_model=CommentResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_comment_replies(
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
+    comment_id: Annotated[int, Doc("Comment ID.")],
+    filter: CommentReplyFilter = Depends(),
+):
+    replies, next_cursor = await comment_crud.get_replies(session=session, parent_id=comment_id, filter=filter)
+    return fast_response(CommentResponse, BaseResponseDataMapper(
+        replies, limit=filter.limit, total=None, next_cursor=next_cursor
+    ).result_schema)
+
+
 @router.post(
     "/comment",
     status_code=status.HTTP_200_OK,
@@ -95,7 +332,14 @@ async def post_by_id_anime_comments(
     user_id = verify_access_token(access_token)
     comment_dict = data.model_dump()
     comment_dict.update(user_id=user_id)
-    await comment_crud.create(session=session, obj_in=comment_dict)
+    if data.parent is not None:
+        parent = await comment_crud.get_by_id(session=session, obj_id=data.parent)
+        if parent is None or parent.anime_id != data.anime_id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+        # Threads are one level deep, a reply to a reply joins the thread of its parent.
+        comment_dict.update(parent=parent.parent or parent.id)
+    comment = await comment_crud.create(session=session, obj_in=comment_dict)
+    await comment_hub.publish(comment, session=session)
     return {"status": "ok"}
 
 
@@ -133,3 +377,36 @@ async def create_anime(
     await validate_permission(user_id, "admin", session)
     anime = await anime_crud.create(session=session, obj_in=data)
     return anime
+
+
+@router.post(
+    "/bulk",
+    status_code=status.HTTP_200_OK,
+)
+async def bulk_upsert_anime(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    data: Annotated[list[AnimeBulkItem], Doc("Anime data with related rows.")],
+    chunk_size: Annotated[int | None, Query(ge=1, le=5000, description="rows per transaction")] = None,
+    access_token: str | None = Cookie(default=None),
+):
+    user_id = verify_access_token(access_token)
+    await validate_permission(user_id, "admin", session)
+    return await anime_crud.bulk_upsert(objs_in=data, session=session, chunk_size=chunk_size)
+
+
+@router.post(
+    "/bulk/ndjson",
+    status_code=status.HTTP_200_OK,
+)
+async def bulk_upsert_anime_ndjson(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    chunk_size: Annotated[int | None, Query(ge=1, le=5000, description="rows per transaction")] = None,
+    access_token: str | None = Cookie(default=None),
+):
+    """
+    Body is newline-delimited `AnimeBulkItem` JSON, loaded while it is being received.
+    """
+    user_id = verify_access_token(access_token)
+    await validate_permission(user_id, "admin", session)
+    return await bulk_upsert_ndjson(anime_crud, AnimeBulkItem, request.stream(), session, chunk_size=chunk_size)
@@ -5,12 +5,14 @@ from fastapi.exceptions import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.schemas.director import DirectorResponseBase, DirectorCreate, DirectorUpdate
-from app.core.db import get_async_session
+from app.core.db import get_async_session, get_async_read_session
 from app.core.controllers.director import director_crud
 from app.core.filters.base import BaseIdNameFilterWithoutLimit
+from app.core.cache import CachedRoute, cache_response
+from app.core.serializers import fast_response
 from app.core.security import verify_access_token, validate_permission
 
-router: APIRouter = APIRouter()
+router: APIRouter = APIRouter(route_class=CachedRoute)
 
 
 @router.get(
@@ -18,12 +20,13 @@ router: APIRouter = APIRouter()
     response_model=list[DirectorResponseBase],
     status_code=status.HTTP_200_OK,
 )
+@cache_response("director")
 async def get_all_directors(
-    session: Annotated[AsyncSession, Depends(get_async_session)],
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
     filter: BaseIdNameFilterWithoutLimit = Depends(),
 ):
-    directors, _ = await director_crud.get_all(session=session, filter=filter)
-    return directors
+    directors, _ = await director_crud.get_all(session=session, filter=filter, total_strategy="none")
+    return fast_response(DirectorResponseBase, directors)
 
 
 @router.get(
@@ -31,13 +34,14 @@ async def get_all_directors(
     response_model=DirectorResponseBase,
     status_code=status.HTTP_200_OK,
 )
+@cache_response("director")
 async def get_by_id_director(
-    session: Annotated[AsyncSession, Depends(get_async_session)],
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
     id: Annotated[int, Doc("Director ID.")],
 ):
 
     director = await director_crud.get_by_id(session=session, obj_id=id)
-    return director
+    return fast_response(DirectorResponseBase, director)
 
 
 @router.post(
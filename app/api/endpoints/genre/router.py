@@ -5,12 +5,14 @@ from fastapi.exceptions import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.schemas.genre import GenreResponseBase, GenreCreate, GenreUpdate
-from app.core.db import get_async_session
+from app.core.db import get_async_session, get_async_read_session
 from app.core.controllers.genre import genre_crud
 from app.core.filters.base import BaseIdNameFilterWithoutLimit
+from app.core.cache import CachedRoute, cache_response
+from app.core.serializers import fast_response
 from app.core.security import verify_access_token, validate_permission
 
-router: APIRouter = APIRouter()
+router: APIRouter = APIRouter(route_class=CachedRoute)
 
 
 @router.get(
@@ -18,13 +20,14 @@ router: APIRouter = APIRouter()
     response_model=list[GenreResponseBase],
     status_code=status.HTTP_200_OK,
 )
+@cache_response("genre")
 async def get_all_genres(
-    session: Annotated[AsyncSession, Depends(get_async_session)],
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
     filter: BaseIdNameFilterWithoutLimit = Depends(),
 ):
 
-    genres, _ = await genre_crud.get_all(session=session, filter=filter)
-    return genres
+    genres, _ = await genre_crud.get_all(session=session, filter=filter, total_strategy="none")
+    return fast_response(GenreResponseBase, genres)
 
 
 @router.get(
@@ -32,13 +35,14 @@ async def get_all_genres(
     response_model=GenreResponseBase,
     status_code=status.HTTP_200_OK,
 )
+@cache_response("genre")
 async def get_by_id_genre(
-    session: Annotated[AsyncSession, Depends(get_async_session)],
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
     id: Annotated[str, Doc("Genre ID.")],
 ):
 
     genre = await genre_crud.get_by_id(session=session, obj_id=id)
-    return genre
+    return fast_response(GenreResponseBase, genre)
 
 
 @router.post(
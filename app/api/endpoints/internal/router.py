@@ -0,0 +1,36 @@
+from typing_extensions import Annotated
+
+from fastapi import APIRouter, status, Depends, Cookie
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import get_async_session, engine, replica_router
+from app.core.cache import response_cache
+from app.core.security import verify_access_token, validate_permission
+
+router: APIRouter = APIRouter()
+
+
+@router.get(
+    "/cache",
+    status_code=status.HTTP_200_OK,
+)
+async def get_cache_stats(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    access_token: str | None = Cookie(default=None),
+):
+    user_id = verify_access_token(access_token)
+    await validate_permission(user_id, "admin", session)
+    return response_cache.stats
+
+
+@router.get(
+    "/pool",
+    status_code=status.HTTP_200_OK,
+)
+async def get_pool_stats(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    access_token: str | None = Cookie(default=None),
+):
+    user_id = verify_access_token(access_token)
+    await validate_permission(user_id, "admin", session)
+    return dict(primary=engine.pool.stats, replicas=[replica.stats for replica in replica_router.replicas])
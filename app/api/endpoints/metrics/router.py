@@ -0,0 +1,37 @@
+import hmac
+
+from fastapi import APIRouter, status, Header
+from fastapi.responses import PlainTextResponse
+
+from app.core.db import engine, replica_router
+from app.core.metrics import registry, DB_POOL_CHECKED_OUT, DB_POOL_SIZE, DB_POOL_WAITING, DB_POOL_TIMEOUTS
+from app.core.security import UNAUTHORIZED_EXCEPTION
+from app.core.settings import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router: APIRouter = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    status_code=status.HTTP_200_OK,
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+)
+async def get_metrics(
+    authorization: str | None = Header(default=None),
+):
+    """
+    Prometheus text exposition of this worker's metrics, for holders of `settings.metrics_token`.
+    """
+    if not settings.metrics_token or not hmac.compare_digest(
+        authorization or "", f"Bearer {settings.metrics_token}"
+    ):
+        raise UNAUTHORIZED_EXCEPTION
+    for pool in [engine.pool] + [replica.engine.pool for replica in replica_router.replicas]:
+        DB_POOL_CHECKED_OUT.set(pool.checkedout(), pool.database)
+        DB_POOL_SIZE.set(pool.checkedin() + pool.checkedout(), pool.database)
+        DB_POOL_WAITING.set(pool.waiting, pool.database)
+        DB_POOL_TIMEOUTS.set(pool.timeouts, pool.database)
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
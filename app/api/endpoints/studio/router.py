@@ -5,12 +5,14 @@ from fastapi.exceptions import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.schemas.studio import StudioResponseBase, StudioUpdate, StudioCreate
-from app.core.db import get_async_session
+from app.core.db import get_async_session, get_async_read_session
 from app.core.controllers.studio import studio_crud
 from app.core.filters.base import BaseIdNameFilterWithoutLimit
+from app.core.cache import CachedRoute, cache_response
+from app.core.serializers import fast_response
 from app.core.security import verify_access_token, validate_permission
 
-router: APIRouter = APIRouter()
+router: APIRouter = APIRouter(route_class=CachedRoute)
 
 
 @router.get(
@@ -18,13 +20,14 @@ router: APIRouter = APIRouter()
     response_model=list[StudioResponseBase],
     status_code=status.HTTP_200_OK,
 )
+@cache_response("studio")
 async def get_all_studios(
-    session: Annotated[AsyncSession, Depends(get_async_session)],
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
     filter: BaseIdNameFilterWithoutLimit = Depends(),
 ):
 
-    studios, _ = await studio_crud.get_all(session=session, filter=filter)
-    return studios
+    studios, _ = await studio_crud.get_all(session=session, filter=filter, total_strategy="none")
+    return fast_response(StudioResponseBase, studios)
 
 
 @router.get(
@@ -32,13 +35,14 @@ async def get_all_studios(
     response_model=StudioResponseBase,
     status_code=status.HTTP_200_OK,
 )
+@cache_response("studio")
 async def get_by_id_studio(
-    session: Annotated[AsyncSession, Depends(get_async_session)],
+    session: Annotated[AsyncSession, Depends(get_async_read_session)],
     id: Annotated[int, Doc("Studio ID.")],
 ):
 
     studio = await studio_crud.get_by_id(session=session, obj_id=id)
-    return studio
+    return fast_response(StudioResponseBase, studio)
 
 
 @router.post(
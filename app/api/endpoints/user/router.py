@@ -1,27 +1,40 @@
 
-from typing_extensions import Annotated
+from typing_extensions import Annotated, Doc
+import os
 import re
-import string
-import random
 
-from fastapi import APIRouter, status, Depends, HTTPException, Response, Cookie, UploadFile, File
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, status, Depends, HTTPException, Response, Cookie, UploadFile, File, Body, Query
+from fastapi.responses import RedirectResponse, FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.db import get_async_session
-from app.core.controllers.user import user_crud
+from app.core.controllers.user import user_crud, user_list_crud
+from app.core.controllers.anime import anime_crud
+from app.core.recommendations import recommendation_model
+from app.core.schemas.anime import AnimeCardResponseBase
+from app.core.serializers import fast_response
+from app.core.avatars import avatar_store
+from app.core.tasks import run_in_background, rebuild_recommendations as rebuild_recommendations_job
+from app.core.filters.user import UserListFilter
+from app.core.mapper import BaseResponseDataMapper
 from app.core.schemas.user import (
     LoginSchema,
     RegistrationSchema,
     UserBase,
     UserRegistration,
     UserPrivateResponseBase,
+    UserListResponse,
+    UserListChange,
+    UserListStatus,
 )
 from app.core.security import (
     create_access_token,
-    encrypt_password,
+    hash_password,
+    verify_password,
+    needs_rehash,
     verify_access_token,
-    verify_turnstile_token
+    verify_turnstile_token,
+    validate_permission,
 )
 from app.api.endpoints.user.vk import VK
 from app.core.settings import settings
@@ -41,8 +54,7 @@ async def user_registration(
     session: Annotated[AsyncSession, Depends(get_async_session)],
 ):
     data: dict = data.model_dump()
-    data.update(password=encrypt_password(data["password"]))
-    if not verify_turnstile_token(data.pop("token")):
+    if not await verify_turnstile_token(data.pop("token")):
         raise HTTPException(status_code=400, detail="Неверная капча.")
     if not re.findall(EMAIL_REGEX, data["email"]):
         raise HTTPException(status_code=400, detail="Неверная почта.")
@@ -50,6 +62,7 @@ async def user_registration(
         raise HTTPException(status_code=400, detail="Данный логин уже занят.")
     if await user_crud.get_by_attribute(attr_name="email", attr_value=data["email"], session=session):
         raise HTTPException(status_code=400, detail="Данная почта уже зарегистрирована.")
+    data.update(password=await hash_password(data["password"]))
     obj_in = UserRegistration(**data)
     obj_db = await user_crud.create(obj_in=obj_in, session=session)
     access_token = create_access_token({"sub": str(obj_db.id)})
@@ -67,12 +80,13 @@ async def user_login(
     session: Annotated[AsyncSession, Depends(get_async_session)],
 ):
     data: dict = data.model_dump()
-    data.update(password=encrypt_password(data["password"]))
-    if not verify_turnstile_token(data.pop("token")):
+    if not await verify_turnstile_token(data.pop("token")):
         raise HTTPException(status_code=400, detail="Неверная капча.")
-    user = await user_crud.get_by_creditionals(login_or_email=data["login"], hashed_password=data["password"], session=session)
-    if not user:
+    user = await user_crud.get_by_login(login_or_email=data["login"], session=session)
+    if not await verify_password(data["password"], user.password if user else None):
         raise HTTPException(status_code=401, detail="Неверные данные для входа.")
+    if needs_rehash(user.password):
+        await user_crud.update(session=session, db_obj=user, obj_in={"password": await hash_password(data["password"])})
     access_token = create_access_token({"sub": str(user.id)})
     response.set_cookie(
         key="access_token",
@@ -166,6 +180,120 @@ async def get_profile(
     return user
 
 
+@router.get(
+    "/profile/list",
+    response_model=UserListResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_profile_list(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    filter: UserListFilter = Depends(),
+    access_token: str | None = Cookie(default=None),
+):
+    user_id = verify_access_token(access_token)
+    user_list, total, next_cursor = await user_list_crud.get_user_list(session=session, user_id=user_id, filter=filter)
+    return BaseResponseDataMapper(user_list, limit=filter.limit, total=total, next_cursor=next_cursor).result_schema
+
+
+@router.get(
+    "/profile/list/counts",
+    status_code=status.HTTP_200_OK,
+)
+async def get_profile_list_counts(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    access_token: str | None = Cookie(default=None),
+):
+    user_id = verify_access_token(access_token)
+    return await user_list_crud.get_counts(session=session, user_id=user_id)
+
+
+@router.put(
+    "/profile/list/{anime_id}",
+    status_code=status.HTTP_200_OK,
+)
+async def put_profile_list_anime(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    anime_id: Annotated[int, Doc("Anime ID.")],
+    data: UserListStatus,
+    access_token: str | None = Cookie(default=None),
+):
+    user_id = verify_access_token(access_token)
+    changes = [UserListChange(anime_id=anime_id, status=data.status)]
+    counts = await user_list_crud.apply_changes(session=session, user_id=user_id, changes=changes)
+    if counts is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Anime not found")
+    return counts
+
+
+@router.delete(
+    "/profile/list/{anime_id}",
+    status_code=status.HTTP_200_OK,
+)
+async def delete_profile_list_anime(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    anime_id: Annotated[int, Doc("Anime ID.")],
+    access_token: str | None = Cookie(default=None),
+):
+    user_id = verify_access_token(access_token)
+    changes = [UserListChange(anime_id=anime_id, status=None)]
+    return await user_list_crud.apply_changes(session=session, user_id=user_id, changes=changes)
+
+
+@router.get(
+    "/recommendations",
+    response_model=list[AnimeCardResponseBase],
+    status_code=status.HTTP_200_OK,
+)
+async def get_recommendations(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    limit: Annotated[int, Query(ge=1, le=50)] = 20,
+    access_token: str | None = Cookie(default=None),
+):
+    user_id = verify_access_token(access_token)
+    recommendation_model.reload_if_changed()
+    seen = await user_list_crud.get_seen(session=session, user_id=user_id)
+    ids = recommendation_model.recommend(seen, limit)
+    if not ids:
+        # Empty list or an unknown taste: fall back to the chart.
+        chart_ids = await anime_crud.get_chart_ids(session=session, limit=limit + len(seen))
+        seen = set(seen)
+        ids = [id for id in chart_ids if id not in seen][:limit]
+    anime = await anime_crud.get_cards(session=session, ids=ids)
+    return fast_response(AnimeCardResponseBase, anime)
+
+
+@router.post(
+    "/recommendations/rebuild",
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def rebuild_recommendations(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    access_token: str | None = Cookie(default=None),
+):
+    """
+    Start a rebuild of the recommendation model in the background, `started` is false while one is running.
+    """
+    user_id = verify_access_token(access_token)
+    await validate_permission(user_id, "admin", session)
+    return {"started": run_in_background("recommendations", rebuild_recommendations_job)}
+
+
+@router.post(
+    "/profile/list/batch",
+    status_code=status.HTTP_200_OK,
+)
+async def batch_profile_list(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    data: Annotated[list[UserListChange], Body(max_length=1000)],
+    access_token: str | None = Cookie(default=None),
+):
+    user_id = verify_access_token(access_token)
+    counts = await user_list_crud.apply_changes(session=session, user_id=user_id, changes=data)
+    if counts is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Batch references an unknown anime")
+    return counts
+
+
 @router.patch(
     "/profile/avatar",
     status_code=status.HTTP_200_OK,
@@ -177,9 +305,31 @@ async def post_avatar(
 ):
     user_id = verify_access_token(access_token)
     user = await user_crud.get_by_id(session=session, obj_id=user_id)
-    random_name = "".join([random.choice(string.ascii_letters + string.digits) for _ in range(10)])
-    path = settings.avatar_path + random_name
-    with open(path, "wb+") as f:
-        f.write(file.file.read())
-    await user_crud.update(session=session, db_obj=user, obj_in={"avatar": path})
-    return {"status": "ok"}
+    name, thumbnails = await avatar_store.save(file)
+    avatar = settings.avatar_url + name
+    await user_crud.update(session=session, db_obj=user, obj_in={"avatar": avatar})
+    return {
+        "status": "ok",
+        "avatar": avatar,
+        "thumbnails": [settings.avatar_url + thumbnail for thumbnail in thumbnails],
+    }
+
+
+@router.get(
+    "/avatar/{name}",
+    response_class=FileResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_avatar(
+    name: Annotated[str, Doc("Avatar or thumbnail file name.")],
+):
+    """
+    Names are content hashes, so a response never changes and is cached for a year.
+    """
+    path = avatar_store.path(name)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Avatar not found")
+    return FileResponse(path, headers={
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "ETag": f'"{name.split(".")[0]}"',
+    })
@@ -5,12 +5,14 @@ from app.api.endpoints.director import router as director_router
 from app.api.endpoints.genre import router as genre_router
 from app.api.endpoints.studio import router as studio_router
 from app.api.endpoints.user import router as user_router
+from app.api.endpoints.internal import router as internal_router
 
 ANIME_PREFIX = "/anime"
 GENRE_PREFIX = "/genre"
 DIRECTOR_PREFIX = "/director"
 STUDIO_PREFIX = "/studio"
 USER_PREFIX = "/user"
+INTERNAL_PREFIX = "/internal"
 
 main_router = APIRouter(prefix="/api")
 
@@ -19,3 +21,4 @@ main_router.include_router(director_router.router, prefix=DIRECTOR_PREFIX, tags=
 main_router.include_router(genre_router.router, prefix=GENRE_PREFIX, tags=["Genre"])
 main_router.include_router(studio_router.router, prefix=STUDIO_PREFIX, tags=["Studio"])
 main_router.include_router(user_router.router, prefix=USER_PREFIX, tags=["User"])
+main_router.include_router(internal_router.router, prefix=INTERNAL_PREFIX, tags=["Internal"])
@@ -0,0 +1,142 @@
+"""
+This module contains the avatar store: streamed, size-capped and content-addressed uploads.
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image, ImageOps
+
+from app.core.logger import logging
+from app.core.settings import settings
+
+SIGNATURES = {
+    b"\xff\xd8\xff": ".jpg",
+    b"\x89PNG\r\n\x1a\n": ".png",
+    b"GIF87a": ".gif",
+    b"GIF89a": ".gif",
+}
+NAME_PATTERN = re.compile(r"^[0-9a-f]{64}(_\d+)?\.(jpg|png|gif|webp)$")
+
+AVATAR_TOO_LARGE_EXCEPTION = HTTPException(
+    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    detail="Avatar is too large",
+)
+UNSUPPORTED_AVATAR_EXCEPTION = HTTPException(
+    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+    detail="Avatar must be a JPEG, PNG, GIF or WebP image",
+)
+
+
+def detect_extension(head: bytes) -> str | None:
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    for signature, extension in SIGNATURES.items():
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def thumbnail_name(name: str, size: int) -> str:
+    return f"{name.split('.')[0]}_{size}.jpg"
+
+
+def make_thumbnails(path: str, sizes: list[int]) -> list[str]:
+    """
+    Square center-cropped JPEG thumbnails next to `path`, skipping existing ones.
+    CPU bound, meant to run in a worker process.
+    """
+    directory, name = os.path.split(path)
+    written = []
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+        for size in sizes:
+            target = os.path.join(directory, thumbnail_name(name, size))
+            if not os.path.exists(target):
+                ImageOps.fit(image, (size, size)).save(target, "JPEG", quality=85, optimize=True)
+            written.append(os.path.basename(target))
+    return written
+
+
+class AvatarStore:
+    """
+    Writes uploads in chunks from a thread, so the event loop never blocks on disk,
+    and names them by SHA-256 so duplicates are stored once and can be cached forever.
+    Thumbnails are rendered in a process pool.
+    """
+
+    def __init__(self) -> None:
+        self._pool: ProcessPoolExecutor | None = None
+
+    def start(self) -> None:
+        self._pool = ProcessPoolExecutor(
+            max_workers=settings.avatar_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @staticmethod
+    def path(name: str) -> str | None:
+        if not NAME_PATTERN.match(name):
+            return None
+        return os.path.join(settings.avatar_path, name)
+
+    async def save(self, file: UploadFile) -> tuple[str, list[str]]:
+        """
+        Store the upload, returns its file name and the thumbnail names.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        extension = None
+        fd, tmp_path = await asyncio.to_thread(tempfile.mkstemp, dir=settings.avatar_path, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while chunk := await file.read(settings.avatar_chunk_size):
+                    if extension is None:
+                        extension = detect_extension(chunk)
+                        if extension is None:
+                            raise UNSUPPORTED_AVATAR_EXCEPTION
+                    size += len(chunk)
+                    if size > settings.avatar_max_size:
+                        raise AVATAR_TOO_LARGE_EXCEPTION
+                    digest.update(chunk)
+                    await asyncio.to_thread(tmp.write, chunk)
+            if extension is None:
+                raise UNSUPPORTED_AVATAR_EXCEPTION
+            name = digest.hexdigest() + extension
+            path = os.path.join(settings.avatar_path, name)
+            if await asyncio.to_thread(os.path.exists, path):
+                await asyncio.to_thread(os.remove, tmp_path)
+            else:
+                await asyncio.to_thread(os.replace, tmp_path, path)
+        except BaseException:
+            await asyncio.to_thread(_remove_quietly, tmp_path)
+            raise
+        thumbnails = []
+        if self._pool is not None:
+            try:
+                thumbnails = await asyncio.get_running_loop().run_in_executor(
+                    self._pool, make_thumbnails, path, settings.avatar_thumbnail_sizes
+                )
+            except Exception as e:
+                logging.error(e, exc_info=True)
+        return name, thumbnails
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+avatar_store = AvatarStore()
@@ -0,0 +1,57 @@
+"""
+This module contains streaming NDJSON ingestion for `CRUDBase.bulk_upsert`.
+"""
+
+from typing_extensions import AsyncIterator, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.controllers.base import CRUDBase
+from app.core.settings import settings
+
+
+async def bulk_upsert_ndjson(
+    crud: CRUDBase, schema: Type[BaseModel], stream: AsyncIterator[bytes], session: AsyncSession,
+    chunk_size: int | None = None,
+) -> dict:
+    """
+    Validate one object per line and upsert every `chunk_size` valid objects while the body is still streaming.
+    Invalid lines are reported with their 1-based line number and skipped.
+    """
+    chunk_size = chunk_size or settings.bulk_chunk_size
+    report = dict(processed=0, upserted=0, errors=[])
+    chunk: list[BaseModel] = []
+
+    async def flush() -> None:
+        chunk_report = await crud.bulk_upsert(chunk, session, chunk_size=chunk_size, offset=report["processed"])
+        report["processed"] += chunk_report["processed"]
+        report["upserted"] += chunk_report["upserted"]
+        report["errors"].extend(chunk_report["errors"])
+        chunk.clear()
+
+    line_number = 0
+    buffer = b""
+    async for data in stream:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                chunk.append(schema.model_validate_json(line))
+            except ValidationError as e:
+                report["errors"].append(dict(line=line_number, detail=str(e)))
+                continue
+            if len(chunk) >= chunk_size:
+                await flush()
+    if buffer.strip():
+        line_number += 1
+        try:
+            chunk.append(schema.model_validate_json(buffer))
+        except ValidationError as e:
+            report["errors"].append(dict(line=line_number, detail=str(e)))
+    if chunk:
+        await flush()
+    return report
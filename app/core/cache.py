@@ -0,0 +1,193 @@
+"""
+This module contains in-process caches and the response cache for read-only routes.
+"""
+
+from collections import OrderedDict
+from time import monotonic
+from typing_extensions import Any, Callable, Coroutine, Hashable
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from app.core.db import reads_pinned
+from app.core.settings import settings
+
+# Seconds after a write during which a replica may still serve the old rows:
+# the lag limit plus the time it takes the lag check to notice a replica falling behind.
+REPLICA_STALE_WINDOW = int(settings.postgres_replica_max_lag + settings.postgres_replica_check_interval) + 1
+
+
+class TTLCache:
+    """
+    A small in-process LRU cache with per-entry expiry and a bounded size.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        self._data[key] = (monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class MemoryCacheBackend:
+    """
+    Per-worker backend, other workers see a write only when their entries expire.
+    Its TTL is capped by `settings.cache_memory_ttl`, deployments with several
+    workers should set `settings.cache_url`.
+    """
+
+    def __init__(self, ttl: int, maxsize: int) -> None:
+        self._cache = TTLCache(ttl=ttl, maxsize=maxsize)
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+
+class RedisCacheBackend:
+    """
+    Backend shared by all workers, works with any server speaking the Redis protocol.
+    """
+
+    def __init__(self, url: str) -> None:
+        from redis import asyncio as redis  # `redis` extra
+
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self._client.set(key, value, ex=ttl)
+
+    async def get_counter(self, key: str) -> int:
+        return int(await self._client.get(key) or 0)
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(key)
+
+
+class ResponseCache:
+    """
+    Caches serialized responses keyed on namespace, route path and normalized query.
+
+    Each namespace has a version counter that is part of every key,
+    so invalidating a namespace is a single increment.
+    """
+
+    def __init__(self, backend: MemoryCacheBackend | RedisCacheBackend, ttl: int) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def key(self, namespace: str, request: Request) -> str:
+        version = await self.backend.get_counter(f"cache:version:{namespace}")
+        query = urlencode(sorted(request.query_params.multi_items()))
+        return f"cache:{namespace}:{version}:{request.url.path}?{query}"
+
+    async def get(self, key: str) -> bytes | None:
+        body = await self.backend.get(key)
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body
+
+    async def set(self, key: str, body: bytes) -> None:
+        await self.backend.set(key, body, ttl=self.ttl)
+
+    async def invalidate(self, *namespaces: str) -> None:
+        for namespace in namespaces:
+            await self.backend.incr(f"cache:version:{namespace}")
+            if settings.postgres_replica_urls:
+                await self.backend.set(f"cache:invalidated:{namespace}", b"1", ttl=REPLICA_STALE_WINDOW)
+
+    async def replica_may_lag(self, namespace: str) -> bool:
+        """
+        Whether a replica may not have replayed the last invalidating write yet.
+        """
+        return await self.backend.get(f"cache:invalidated:{namespace}") is not None
+
+    @property
+    def stats(self) -> dict:
+        return dict(backend=type(self.backend).__name__, hits=self.hits, misses=self.misses)
+
+
+def cache_response(namespace: str) -> Callable:
+    """
+    Mark a GET endpoint as cacheable, it takes effect on routers using `CachedRoute`.
+    """
+
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.cache_namespace = namespace
+        return endpoint
+
+    return decorator
+
+
+class CachedRoute(APIRoute):
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        namespace = getattr(self.endpoint, "cache_namespace", None)
+        if namespace is None:
+            return handler
+
+        async def cached_handler(request: Request) -> Response:
+            if request.method != "GET" or reads_pinned(request):
+                return await handler(request)
+            key = await response_cache.key(namespace, request)
+            body = await response_cache.get(key)
+            if body is not None:
+                return Response(body, media_type="application/json", headers={"X-Cache": "HIT"})
+            response = await handler(request)
+            if response.status_code == 200 and not (
+                getattr(request.state, "replica", False) and await response_cache.replica_may_lag(namespace)
+            ):
+                await response_cache.set(key, response.body)
+            response.headers["X-Cache"] = "MISS"
+            return response
+
+        return cached_handler
+
+
+if settings.cache_url:
+    response_cache = ResponseCache(backend=RedisCacheBackend(settings.cache_url), ttl=settings.cache_ttl)
+else:
+    memory_ttl = min(settings.cache_ttl, settings.cache_memory_ttl)
+    response_cache = ResponseCache(
+        backend=MemoryCacheBackend(ttl=memory_ttl, maxsize=settings.cache_maxsize), ttl=memory_ttl
+    )
@@ -0,0 +1,32 @@
+"""
+This module contains the process pool that runs CPU bound model builds off the event loop.
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing_extensions import Any, Callable
+
+
+class ComputePool:
+    """
+    One spawned process per app worker, started by the app lifespan and reused by every
+    build, so builds never block the event loop nor pay a process start each time.
+    """
+
+    def __init__(self) -> None:
+        self._pool: ProcessPoolExecutor | None = None
+
+    def start(self) -> None:
+        self._pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, function: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._pool, function, *args)
+
+
+compute_pool = ComputePool()
@@ -1,11 +1,26 @@
-from sqlalchemy import select
+from time import perf_counter
+from typing_extensions import Any
+
+from sqlalchemy import select, text, func, delete, Select, Row
 from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
 
-from app.core.models.anime import Anime
-from app.core.schemas.anime import AnimeCreate, AnimeUpdate
+from app.core.models.anime import Anime, AnimeGenre, AnimeDirector, AnimeStudio
+from app.core.schemas.anime import AnimeCreate, AnimeUpdate, AnimeBulkItem
 from app.core.controllers.base import CRUDBase
 from app.core.controllers.base import ModelType
+from app.core.models.chart import AnimeChart
+from app.core.models.poster import Poster
 from app.core.models.rating import Rating
+from app.core.models.similar import AnimeSimilar
+from app.core.similar import compute_neighbours
+from app.core.compute import compute_pool
+from app.core.settings import settings
+from app.core.picker import random_picker
+from app.core.suggest import suggest_index
+
+# Ids whose similar lists are stale, flushed by `rebuild_similar_periodically`.
+SIMILAR_PENDING: set[int] = set()
 
 
 class AnimeCRUD(
@@ -17,15 +32,189 @@ class AnimeCRUD(
 ):
     """ Anime CRUD. """
 
-    async def get_chart(self, session: AsyncSession) -> list[ModelType]:
-        stmt = (select(self.model)
-                .join(Rating)
-                .where(Rating.avg_rating is not None and self.model.status == "вышел")
-                .order_by(Rating.avg_rating.desc())
-                .limit(100)
+    async def create(self, obj_in: AnimeCreate | dict, session: AsyncSession) -> Anime:
+        db_obj = await super().create(obj_in=obj_in, session=session)
+        suggest_index.add(db_obj.id, db_obj.name, db_obj.alternative_names)
+        random_picker.add(db_obj.id)
+        SIMILAR_PENDING.add(db_obj.id)
+        return db_obj
+
+    async def update(self, db_obj: Anime, obj_in: AnimeUpdate | dict[str, Any], session: AsyncSession) -> Anime:
+        db_obj = await super().update(db_obj=db_obj, obj_in=obj_in, session=session)
+        suggest_index.add(db_obj.id, db_obj.name, db_obj.alternative_names)
+        SIMILAR_PENDING.add(db_obj.id)
+        return db_obj
+
+    async def remove(self, db_obj: Anime, session: AsyncSession) -> Anime:
+        db_obj = await super().remove(db_obj=db_obj, session=session)
+        suggest_index.remove(db_obj.id)
+        random_picker.remove(db_obj.id)
+        SIMILAR_PENDING.add(db_obj.id)
+        return db_obj
+
+    async def card_constructor(self) -> Select:
+        return (select(self.model.id, self.model.name, self.model.url, self.model.year, self.model.type,
+                       Poster.medium.label("poster"), Rating.avg_rating)
+                .outerjoin(Poster, Poster.anime_id == self.model.id)
                 )
-        result = await session.execute(stmt)
+
+    async def select_constructor(self, filter: BaseModel) -> Select:
+        if getattr(filter, "view", "full") != "card":
+            return select(self.model)
+        stmt = await self.card_constructor()
+        # Unrated titles stay listed, relevance ordering puts them last like the full view.
+        return stmt.outerjoin(Rating, Rating.anime_id == self.model.id)
+
+    async def bulk_upsert_chunk(self, chunk: list[AnimeBulkItem], session: AsyncSession) -> None:
+        related = {"poster", "rating", "genres", "directors", "studios"}
+        await self.upsert_rows(self.model, [item.model_dump(exclude=related) for item in chunk], session)
+        await self.upsert_rows(Poster, [
+            {**item.poster.model_dump(), "anime_id": item.id} for item in chunk if item.poster is not None
+        ], session)
+        await self.upsert_rows(Rating, [
+            {**item.rating.model_dump(), "anime_id": item.id} for item in chunk if item.rating is not None
+        ], session)
+        for field, link_model, link_key in (
+            ("genres", AnimeGenre, "genre_id"),
+            ("directors", AnimeDirector, "director_id"),
+            ("studios", AnimeStudio, "studio_id"),
+        ):
+            items = [item for item in chunk if getattr(item, field) is not None]
+            if not items:
+                continue
+            await session.execute(delete(link_model).where(link_model.anime_id.in_([item.id for item in items])))
+            await self.upsert_rows(link_model, [
+                {"anime_id": item.id, link_key: link_id} for item in items for link_id in getattr(item, field)
+            ], session, update=False)
+        # Explicit ids do not advance the serial sequence used by `create`.
+        await session.execute(text(
+            "SELECT setval(pg_get_serial_sequence('anime', 'id'), (SELECT max(id) FROM anime))"
+        ))
+
+    async def after_bulk_upsert_chunk(self, chunk: list[AnimeBulkItem]) -> None:
+        for item in chunk:
+            suggest_index.add(item.id, item.name, item.alternative_names,
+                              item.poster.small if item.poster is not None else None)
+            random_picker.add(item.id)
+            SIMILAR_PENDING.add(item.id)
+
+    async def get_random(self, session: AsyncSession, filter: BaseModel, count: int = 1) -> list[Anime]:
+        """
+        Pick `count` distinct titles, unfiltered picks come from `random_picker` without scanning the table.
+        """
+        if not any(value is not None for _, value in filter):
+            ids = random_picker.sample(count)
+            result = await session.scalars(select(self.model).where(self.model.id.in_(ids)))
+            positions = {id: position for position, id in enumerate(ids)}
+            return sorted(result.all(), key=lambda anime: positions[anime.id])
+        stmt = await self.filter_constructor(select(self.model), filter)
+        if filter.min_rating is not None:
+            stmt = stmt.join(Rating).where(Rating.avg_rating >= filter.min_rating)
+        result = await session.scalars(stmt.order_by(func.random()).limit(count))
+        return result.all()
+
+    async def get_chart(self, session: AsyncSession, filter: BaseModel) -> list[ModelType]:
+        stmt = select(self.model).join(AnimeChart, AnimeChart.anime_id == self.model.id)
+        stmt = await self.filter_constructor(stmt, filter)
+        result = await session.execute(stmt.order_by(AnimeChart.position))
         return result.scalars().all()
 
+    async def refresh_chart(self, session: AsyncSession, min_interval: int | None = None) -> bool:
+        """
+        Refresh the `anime_chart` view unless another worker is already doing it or,
+        with `min_interval`, did it less than `min_interval` seconds ago.
+        """
+        refreshed = await session.scalar(text("SELECT pg_try_advisory_xact_lock(hashtext('anime_chart'))"))
+        if refreshed and min_interval is not None:
+            refreshed = not await session.scalar(
+                text("SELECT EXISTS (SELECT 1 FROM job_run WHERE name = 'anime_chart'"
+                     " AND finished_at > now() - make_interval(secs => :interval))"),
+                {"interval": float(min_interval)},
+            )
+        if refreshed:
+            await session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY anime_chart"))
+            await session.execute(text(
+                "INSERT INTO job_run (name, finished_at) VALUES ('anime_chart', now())"
+                " ON CONFLICT (name) DO UPDATE SET finished_at = excluded.finished_at"
+            ))
+        await session.commit()
+        return refreshed
+
+    async def get_suggest_source(self, session: AsyncSession) -> list[tuple]:
+        """
+        Rows for `SuggestIndex.sync` without loading the relationship graph.
+        """
+        stmt = (select(self.model.id, self.model.name, self.model.alternative_names, Poster.small)
+                .outerjoin(Poster, Poster.anime_id == self.model.id)
+                )
+        result = await session.execute(stmt)
+        return result.all()
+
+    async def get_similar(self, session: AsyncSession, id: int, limit: int) -> list[Row]:
+        """
+        Cards of the precomputed neighbours, most similar first.
+        """
+        similar_ids = await session.scalar(select(AnimeSimilar.similar_ids).where(AnimeSimilar.anime_id == id))
+        return await self.get_cards(session=session, ids=(similar_ids or [])[:limit])
+
+    async def get_cards(self, session: AsyncSession, ids: list[int]) -> list[Row]:
+        """
+        Card rows of `ids` in the given order, missing ids are skipped.
+        """
+        if not ids:
+            return []
+        stmt = (await self.card_constructor()).outerjoin(Rating, Rating.anime_id == self.model.id)
+        result = await session.execute(stmt.where(self.model.id.in_(ids)))
+        positions = {id: position for position, id in enumerate(ids)}
+        return sorted(result.all(), key=lambda row: positions[row.id])
+
+    async def get_chart_ids(self, session: AsyncSession, limit: int) -> list[int]:
+        result = await session.scalars(select(AnimeChart.anime_id).order_by(AnimeChart.position).limit(limit))
+        return result.all()
+
+    async def get_similarity_source(self, session: AsyncSession) -> list[tuple]:
+        """
+        Rows for `SimilarityModel.build`, links are aggregated per anime in the database.
+        """
+        def links(link_model, column):
+            return select(func.array_agg(column)).where(link_model.anime_id == self.model.id).scalar_subquery()
+
+        stmt = (select(self.model.id,
+                       links(AnimeGenre, AnimeGenre.genre_id),
+                       links(AnimeStudio, AnimeStudio.studio_id),
+                       links(AnimeDirector, AnimeDirector.director_id),
+                       self.model.year, self.model.type, Rating.avg_rating)
+                .outerjoin(Rating, Rating.anime_id == self.model.id)
+                )
+        result = await session.execute(stmt)
+        return [tuple(row) for row in result.all()]
+
+    async def rebuild_similar(self, session: AsyncSession, ids: list[int] | None = None) -> dict:
+        """
+        Recompute the neighbours of every title, or only of `ids`, the titles currently
+        listing them and their new neighbours. The model is built in `compute_pool`
+        so the event loop keeps serving requests.
+        """
+        started = perf_counter()
+        rows = await self.get_similarity_source(session)
+        affected = []
+        if ids is not None:
+            affected = (await session.scalars(
+                select(AnimeSimilar.anime_id).where(AnimeSimilar.similar_ids.overlap(ids))
+            )).all()
+        await session.commit()
+        neighbours = await compute_pool.run(compute_neighbours, rows, settings.similar_top_k, ids, affected)
+        # Concurrent rebuilds write one after another.
+        await session.execute(text("SELECT pg_advisory_xact_lock(hashtext('anime_similar'))"))
+        if ids is None:
+            await session.execute(delete(AnimeSimilar))
+        for start in range(0, len(neighbours), settings.bulk_chunk_size):
+            await self.upsert_rows(AnimeSimilar, [
+                dict(anime_id=id, similar_ids=similar_ids, scores=scores)
+                for id, similar_ids, scores in neighbours[start:start + settings.bulk_chunk_size]
+            ], session)
+        await session.commit()
+        return dict(rebuilt=len(neighbours), titles=len(rows), seconds=round(perf_counter() - started, 3))
+
 
-anime_crud = AnimeCRUD(Anime)
+anime_crud = AnimeCRUD(Anime, cache_namespaces=("anime", "chart"))
@@ -2,38 +2,100 @@
 This module contains a generic class for CRUD operations.
 """
 
+import re
 from dataclasses import dataclass
-from typing_extensions import Any, Generic, Type, TypeVar
+from typing_extensions import Any, Generic, Hashable, Type, TypeVar
 
-from sqlalchemy import select, func, literal_column, desc, asc
+import orjson
+from sqlalchemy import select, func, literal, and_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Query
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.util import find_tables
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from pydantic import BaseModel
 
+from app.core.cache import TTLCache, response_cache
 from app.core.db import Base
 from app.core.models.rating import Rating
 from app.core.models.genre import Genre
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.settings import settings
+from app.core.logger import logging
 
 ModelType = TypeVar("ModelType", bound=Base)  # type: ignore
 PydanticModel = TypeVar("PydanticModel", bound=BaseModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+COUNT_CACHE = TTLCache(ttl=settings.count_cache_ttl)
+MISSING_REFERENCE = re.compile(r'is not present in table "(\w+)"')
+# Filter fields that page, order or shape the response without changing the matched rows.
+COUNT_SIGNATURE_EXCLUDED = {
+    "limit", "offset", "cursor", "with_total", "total_strategy", "order_by", "direction", "view", "pagination",
+}
+
 
 @dataclass
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
     model: Type[ModelType]
+    cache_namespaces: tuple[str, ...] = ()
 
-    async def get_all(self, session: AsyncSession, filter: PydanticModel) -> list[ModelType]:
-        stmt = await self.filter_constructor(select(self.model), filter)
+    async def get_all(
+        self, session: AsyncSession, filter: PydanticModel, total_strategy: str | None = None
+    ) -> list[ModelType]:
+        stmt = await self.filter_constructor(await self.select_constructor(filter), filter)
         stmt = await self.order_by_constructor(stmt, filter)
-        db_objs = await session.scalars(stmt)
-        total_stmt = await self.filter_constructor(select(func.count(self.model.id)),
-                                                   filter, use_limit=False, use_offset=False)
-        total_obj = await session.execute(total_stmt)
-        return db_objs.all(), total_obj.fetchone()[0]
+        result = await session.execute(stmt)
+        db_objs = result.scalars().all() if self.selects_entity(stmt) else result.all()
+        total = await self.total_constructor(session, filter, total_strategy)
+        return db_objs, total
+
+    async def get_all_by_cursor(
+        self, session: AsyncSession, filter: PydanticModel
+    ) -> tuple[list[ModelType], int, str | None]:
+        column, descending = await self.sort_key_constructor(filter)
+        stmt = await self.select_constructor(filter)
+        selects_entity = self.selects_entity(stmt)
+        stmt = stmt.add_columns(column.label("sort_key"))
+        if getattr(column, "class_", self.model) is not self.model:
+            stmt = await self.join_constructor(stmt, column.class_)
+        stmt = await self.filter_constructor(stmt, filter, use_limit=False, use_offset=False)
+        if filter.cursor:
+            value, last_id = decode_cursor(filter.cursor, filter.order_by, filter.direction)
+            stmt = await self.keyset_constructor(stmt, column, descending, value, last_id)
+        stmt = stmt.order_by(*self.sort_order(column, descending)).limit(filter.limit + 1)
+        rows = (await session.execute(stmt)).all()
+        has_next = len(rows) > filter.limit
+        rows = rows[:filter.limit]
+        next_cursor = None
+        db_objs = [row[0] for row in rows] if selects_entity else rows
+        if has_next and db_objs:
+            next_cursor = encode_cursor(filter.order_by, filter.direction, rows[-1].sort_key, db_objs[-1].id)
+        total = await self.total_constructor(session, filter)
+        return db_objs, total, next_cursor
+
+    async def select_constructor(self, filter: PydanticModel) -> Query:
+        """
+        Base statement of list queries, subclasses may select plain columns for lighter views.
+        """
+        return select(self.model)
+
+    def selects_entity(self, stmt: Query) -> bool:
+        return stmt.column_descriptions[0]["expr"] is self.model
+
+    async def join_constructor(self, stmt: Query, target: Type[Base]) -> Query:
+        """
+        Outer join `target` unless the statement already selects from its table,
+        sorting by a related column keeps the rows without a related one.
+        """
+        tables = {table for from_ in stmt.get_final_froms() for table in find_tables(from_)}
+        if target.__table__ in tables:
+            return stmt
+        return stmt.outerjoin(target)
 
     async def get_all_with_pagination(
         self, pagination: PydanticModel, session: AsyncSession
@@ -58,12 +120,71 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return db_obj.first()
 
     async def get_all_by_attribute(
-        self, attr_name: str, attr_value: str | int, session: AsyncSession
+        self, attr_name: str, attr_value: str | int, session: AsyncSession, total_strategy: str = "exact"
     ) -> list[ModelType]:
         attr = getattr(self.model, attr_name)
         db_objs = await session.scalars(select(self.model).where(attr == attr_value))
-        total_obj = await session.execute(select(func.count(self.model.id)).where(attr == attr_value))
-        return db_objs.all(), total_obj.fetchone()[0]
+        total = await self.count(session, select(self.model.id).where(attr == attr_value), total_strategy,
+                                 cache_key=(self.model.__tablename__, attr_name, attr_value))
+        return db_objs.all(), total
+
+    async def count(
+        self, session: AsyncSession, stmt: Query, strategy: str, cache_key: Hashable | None = None
+    ) -> int | None:
+        """
+        Count the rows matched by `stmt`, a filtered select of the model.
+
+        Strategies: `exact` runs COUNT(*), `estimated` reads the planner row estimate,
+        `cached` reuses an exact count for `settings.count_cache_ttl` seconds, `none` skips counting.
+        """
+        if strategy == "none":
+            return None
+        if strategy == "estimated":
+            return await self.estimate_count(session, stmt)
+        if strategy == "cached":
+            total = COUNT_CACHE.get(cache_key)
+            if total is None:
+                total = await self.count(session, stmt, "exact")
+                COUNT_CACHE.set(cache_key, total)
+            return total
+        total_obj = await session.execute(stmt.with_only_columns(func.count(), maintain_column_froms=True))
+        return total_obj.fetchone()[0]
+
+    async def estimate_count(self, session: AsyncSession, stmt: Query) -> int:
+        connection = await session.connection()
+        if stmt.whereclause is None:
+            result = await connection.exec_driver_sql(
+                f"SELECT reltuples::bigint FROM pg_class WHERE relname = '{self.model.__tablename__}'"
+            )
+            total = result.scalar()
+            # reltuples is -1 until the table has been vacuumed or analyzed.
+            if total is not None and total >= 0:
+                return total
+            return await self.count(session, stmt, "exact")
+        query = stmt.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {query}")
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = orjson.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    async def total_constructor(
+        self, session: AsyncSession, filter: PydanticModel, strategy: str | None = None
+    ) -> int | None:
+        if strategy is None:
+            strategy = getattr(filter, "total_strategy", "exact") if getattr(filter, "with_total", True) else "none"
+        stmt = await self.filter_constructor(select(self.model.id), filter, use_limit=False, use_offset=False)
+        cache_key = None
+        if strategy == "cached":
+            signature = filter.model_dump(include=self.count_signature_fields(filter))
+            cache_key = (self.model.__tablename__, orjson.dumps(signature, option=orjson.OPT_SORT_KEYS))
+        return await self.count(session, stmt, strategy, cache_key=cache_key)
+
+    def count_signature_fields(self, filter: PydanticModel) -> set[str]:
+        """
+        Filter fields that change the matched row set, everything but paging, ordering and output options.
+        """
+        return set(type(filter).model_fields) - COUNT_SIGNATURE_EXCLUDED
 
     async def create(
         self, obj_in: CreateSchemaType | dict, session: AsyncSession
@@ -75,8 +196,77 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj = self.model(**obj_in_data)
         session.add(db_obj)
         await session.commit()
+        await response_cache.invalidate(*self.cache_namespaces)
         return db_obj
 
+    async def bulk_upsert(
+        self, objs_in: list[CreateSchemaType | dict], session: AsyncSession, chunk_size: int | None = None,
+        offset: int = 0,
+    ) -> dict:
+        """
+        Upsert objects in chunks, one transaction per chunk. A failed chunk is rolled back
+        and reported, the following chunks are still loaded.
+        """
+        chunk_size = chunk_size or settings.bulk_chunk_size
+        report = dict(processed=0, upserted=0, errors=[])
+        for start in range(0, len(objs_in), chunk_size):
+            chunk = objs_in[start:start + chunk_size]
+            report["processed"] += len(chunk)
+            try:
+                await self.bulk_upsert_chunk(chunk, session)
+                await session.commit()
+                await self.after_bulk_upsert_chunk(chunk)
+                report["upserted"] += len(chunk)
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logging.error(e, exc_info=True)
+                report["errors"].append(dict(
+                    start=offset + start,
+                    end=offset + start + len(chunk) - 1,
+                    detail=str(getattr(e, "orig", e)),
+                ))
+        if report["upserted"]:
+            await response_cache.invalidate(*self.cache_namespaces)
+        return report
+
+    async def bulk_upsert_chunk(self, chunk: list[CreateSchemaType | dict], session: AsyncSession) -> None:
+        rows = [obj if isinstance(obj, dict) else obj.model_dump() for obj in chunk]
+        await self.upsert_rows(self.model, rows, session)
+
+    async def after_bulk_upsert_chunk(self, chunk: list[CreateSchemaType | dict]) -> None:
+        """
+        Hook for in-memory state that must follow committed rows.
+        """
+
+    @staticmethod
+    def missing_reference(error: IntegrityError) -> str | None:
+        """
+        Table of the missing row behind a foreign key violation, None for other integrity errors.
+        """
+        match = MISSING_REFERENCE.search(getattr(error.orig.__cause__, "detail", None) or "")
+        return match.group(1) if match else None
+
+    @staticmethod
+    async def upsert_rows(
+        model: Type[Base], rows: list[dict], session: AsyncSession, update: bool = True
+    ) -> None:
+        """
+        `INSERT ... ON CONFLICT` on the primary key, batched by SQLAlchemy insertmanyvalues.
+        """
+        if not rows:
+            return
+        stmt = pg_insert(model)
+        index_elements = [column.name for column in model.__table__.primary_key]
+        update_columns = [key for key in rows[0] if key not in index_elements]
+        if update and update_columns:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={key: stmt.excluded[key] for key in update_columns},
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+        await session.execute(stmt, rows)
+
     async def update(
         self,
         db_obj: ModelType,
@@ -92,11 +282,13 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         session.add(db_obj)
         await session.commit()
         await session.refresh(db_obj)
+        await response_cache.invalidate(*self.cache_namespaces)
         return db_obj
 
     async def remove(self, db_obj: ModelType, session: AsyncSession) -> ModelType:
         await session.delete(db_obj)
         await session.commit()
+        await response_cache.invalidate(*self.cache_namespaces)
         return db_obj
 
     async def filter_constructor(self, stmt: Query, filter: PydanticModel,
@@ -110,18 +302,58 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                     stmt = stmt.where(attr.ilike(f"%{value}%"))
             elif key == "genre" and value is not None:
                 stmt = stmt.join(self.model.genres).where(Genre.name == value)
+            elif key == "search" and value is not None:
+                search_text = self.model.search_text()
+                stmt = stmt.where(or_(
+                    search_text.contains(value.lower(), autoescape=True),
+                    literal(value.lower()).op("<%")(search_text),
+                ))
             elif key == "limit" and use_limit:
                 stmt = stmt.limit(value)
             elif key == "offset" and use_offset:
                 stmt = stmt.offset(value)
         return stmt
 
+    async def sort_key_constructor(self, filter: PydanticModel) -> tuple[ColumnElement, bool]:
+        """
+        Resolve `order_by`/`direction` to the sort column and whether it is descending.
+        Relevance keeps the same direction semantics as `order_by_constructor`
+        and ranks by search similarity when `search` is set.
+        """
+        if filter.order_by == "relevance":
+            if getattr(filter, "search", None):
+                return await self.similarity_constructor(filter.search), filter.direction == "asc"
+            return Rating.avg_rating, filter.direction == "asc"
+        return getattr(self.model, filter.order_by), filter.direction == "desc"
+
+    async def similarity_constructor(self, search: str) -> ColumnElement[float]:
+        return func.word_similarity(search.lower(), self.model.search_text())
+
+    async def keyset_constructor(self, stmt: Query, column: ColumnElement, descending: bool,
+                                 value: str | int | float | None, last_id: int) -> Query:
+        """
+        Continue after the last seen (sort_key, id) pair, NULL sort keys are ordered last.
+        """
+        id_after = self.model.id < last_id if descending else self.model.id > last_id
+        if value is None:
+            return stmt.where(and_(column.is_(None), id_after))
+        return stmt.where(or_(
+            column < value if descending else column > value,
+            and_(column == value, id_after),
+            column.is_(None),
+        ))
+
+    def sort_order(self, column: ColumnElement, descending: bool) -> list[ColumnElement]:
+        """
+        ORDER BY of list queries in both pagination modes: the sort key with NULLs last, then the id.
+        """
+        return [
+            (column.desc() if descending else column.asc()).nulls_last(),
+            self.model.id.desc() if descending else self.model.id.asc(),
+        ]
+
     async def order_by_constructor(self, stmt: Query, filter: PydanticModel) -> Query:
-        order_by = filter.order_by
-        direction = filter.direction
-        if hasattr(self.model, order_by):
-            stmt = stmt.order_by(asc(literal_column(order_by) if direction == "asc" else desc(literal_column(order_by))))
-        else:
-            if order_by == "relevance":
-                stmt = stmt.join(Rating).order_by(Rating.avg_rating.desc() if direction == "asc" else Rating.avg_rating).where(Rating.avg_rating is not None)
-        return stmt
+        column, descending = await self.sort_key_constructor(filter)
+        if getattr(column, "class_", self.model) is not self.model:
+            stmt = await self.join_constructor(stmt, column.class_)
+        return stmt.order_by(*self.sort_order(column, descending))
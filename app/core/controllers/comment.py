@@ -1,8 +1,14 @@
-from sqlalchemy import select, func
+from datetime import datetime
+
+from sqlalchemy import select, true, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
+from pydantic import BaseModel
 
 from app.core.controllers.base import CRUDBase
 from app.core.models.comment import Comment
+from app.core.pagination import encode_cursor, decode_cursor, INVALID_CURSOR_EXCEPTION
 from app.core.schemas.comment import CommentCreate, CommentUpdate
 
 
@@ -15,12 +21,75 @@ class CommentCRUD(
 ):
     """ Comment CRUD. """
     async def get_all_by_attribute(
-        self, attr_name: str, attr_value: str | int, session: AsyncSession
+        self, attr_name: str, attr_value: str | int, session: AsyncSession, total_strategy: str = "exact"
     ) -> list[Comment]:
         attr = getattr(Comment, attr_name)
         db_objs = await session.scalars(select(Comment).where(attr == attr_value).order_by(Comment.comment_date.desc()))
-        total_obj = await session.execute(select(func.count(Comment.id)).where(attr == attr_value))
-        return db_objs.all(), total_obj.fetchone()[0]
+        total = await self.count(session, select(Comment.id).where(attr == attr_value), total_strategy,
+                                 cache_key=(Comment.__tablename__, attr_name, attr_value))
+        return db_objs.all(), total
+
+    async def get_threads(
+        self, session: AsyncSession, anime_id: int, filter: BaseModel
+    ) -> tuple[list[Comment], str | None]:
+        """
+        One page of top-level comments, newest first, each with its first `filter.replies` replies.
+        """
+        stmt = select(Comment).where(Comment.anime_id == anime_id, Comment.parent.is_(None))
+        if filter.cursor:
+            last_date, last_id = self._decode_cursor(filter.cursor, "desc")
+            stmt = stmt.where(tuple_(Comment.comment_date, Comment.id) < tuple_(last_date, last_id))
+        stmt = stmt.order_by(Comment.comment_date.desc(), Comment.id.desc()).limit(filter.limit + 1)
+        threads, next_cursor = self._page((await session.scalars(stmt)).all(), filter.limit, "desc")
+
+        replies = {thread.id: [] for thread in threads}
+        if threads and filter.replies:
+            thread_ids = select(Comment.id).where(Comment.id.in_(replies)).subquery()
+            first_replies = (
+                select(Comment)
+                .where(Comment.parent == thread_ids.c.id)
+                .order_by(Comment.comment_date, Comment.id)
+                .limit(filter.replies)
+                .lateral()
+            )
+            reply = aliased(Comment, first_replies)
+            stmt = select(reply).select_from(thread_ids).join(first_replies, true())
+            for db_obj in (await session.scalars(stmt)).all():
+                replies[db_obj.parent].append(db_obj)
+        for thread in threads:
+            set_committed_value(thread, "replies", replies[thread.id])
+        return threads, next_cursor
+
+    async def get_replies(
+        self, session: AsyncSession, parent_id: int, filter: BaseModel
+    ) -> tuple[list[Comment], str | None]:
+        """
+        One page of replies to a comment, oldest first, continued by keyset from `filter.cursor`.
+        """
+        stmt = select(Comment).where(Comment.parent == parent_id)
+        if filter.cursor:
+            last_date, last_id = self._decode_cursor(filter.cursor, "asc")
+            stmt = stmt.where(tuple_(Comment.comment_date, Comment.id) > tuple_(last_date, last_id))
+        stmt = stmt.order_by(Comment.comment_date, Comment.id).limit(filter.limit + 1)
+        return self._page((await session.scalars(stmt)).all(), filter.limit, "asc")
+
+    @staticmethod
+    def _page(db_objs: list[Comment], limit: int, direction: str) -> tuple[list[Comment], str | None]:
+        has_next = len(db_objs) > limit
+        db_objs = db_objs[:limit]
+        next_cursor = None
+        if has_next and db_objs:
+            last = db_objs[-1]
+            next_cursor = encode_cursor("comment_date", direction, last.comment_date.isoformat(), last.id)
+        return db_objs, next_cursor
+
+    @staticmethod
+    def _decode_cursor(cursor: str, direction: str) -> tuple[datetime, int]:
+        value, obj_id = decode_cursor(cursor, "comment_date", direction)
+        try:
+            return datetime.fromisoformat(value), obj_id
+        except (TypeError, ValueError):
+            raise INVALID_CURSOR_EXCEPTION
 
 
 comment_crud = CommentCRUD(Comment)
@@ -13,4 +13,4 @@ class DirectorCRUD(
     """ Director CRUD. """
 
 
-director_crud = DirectorCRUD(Director)
+director_crud = DirectorCRUD(Director, cache_namespaces=("director", "anime"))
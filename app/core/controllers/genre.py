@@ -13,4 +13,4 @@ class GenreCRUD(
     """ Genre CRUD. """
 
 
-genre_crud = GenreCRUD(Genre)
+genre_crud = GenreCRUD(Genre, cache_namespaces=("genre", "anime"))
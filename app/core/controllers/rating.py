@@ -0,0 +1,150 @@
+from time import perf_counter
+
+from sqlalchemy import Float, Numeric, case, cast, delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+
+from app.core.models.rating import Rating, UserRating
+from app.core.schemas.rating import RatingCreateBase, RatingUpdate
+from app.core.controllers.base import CRUDBase
+from app.core.cache import TTLCache
+from app.core.settings import settings
+
+MEAN_CACHE = TTLCache(ttl=settings.chart_refresh_interval, maxsize=1)
+
+
+class RatingCRUD(
+    CRUDBase[
+        Rating,
+        RatingCreateBase,
+        RatingUpdate,
+    ]
+):
+    """ Rating CRUD. """
+
+    @staticmethod
+    def weighted_sums() -> tuple[ColumnElement, ColumnElement]:
+        """
+        Sum of weighted source ratings and sum of their weights, a missing or zero rating is skipped.
+        The average user score counts as one more source once it has `settings.user_rating_min_votes` votes.
+        """
+        user_avg = case(
+            (Rating.user_rating_count >= settings.user_rating_min_votes,
+             cast(Rating.user_rating_sum, Float) / func.nullif(Rating.user_rating_count, 0)),
+        )
+        sources = [(getattr(Rating, source), weight) for source, weight in settings.rating_weights.items()]
+        sources.append((user_avg, settings.user_rating_weight))
+        scores, weights = [], []
+        for column, weight in sources:
+            value = func.nullif(column, 0)
+            scores.append(func.coalesce(value * weight, 0))
+            weights.append(case((value.is_not(None), weight), else_=0))
+        return sum(scores[1:], scores[0]), sum(weights[1:], weights[0])
+
+    def avg_rating_expression(self, mean: float) -> ColumnElement[float]:
+        """
+        NULL for titles without a single weighted rating, so they stay out of the chart.
+        """
+        score, weight = self.weighted_sums()
+        prior = settings.rating_prior_weight
+        return case(
+            (weight > 0, cast(func.round(cast((prior * mean + score) / (prior + weight), Numeric), 2), Float)),
+            else_=None,
+        )
+
+    async def catalogue_mean(self, session: AsyncSession, cached: bool = True) -> float:
+        mean = MEAN_CACHE.get("mean") if cached else None
+        if mean is None:
+            score, weight = self.weighted_sums()
+            mean = await session.scalar(select(func.avg(score / func.nullif(weight, 0)))) or 0
+            MEAN_CACHE.set("mean", mean)
+        return mean
+
+    async def rate(self, session: AsyncSession, user_id: int, anime_id: int, score: int | None) -> dict | None:
+        """
+        Set or remove (`score=None`) a user score. The trigger on `user_rating` adjusts the anime
+        aggregates and only that anime's `avg_rating` is recomputed, in the same transaction.
+        It stays NULL until the title has a source rating or `settings.user_rating_min_votes` votes.
+        Returns None when the anime does not exist.
+        """
+        mean = await self.catalogue_mean(session)
+        try:
+            if score is None:
+                await session.execute(
+                    delete(UserRating).where(UserRating.user_id == user_id, UserRating.anime_id == anime_id)
+                )
+            else:
+                await self.upsert_rows(UserRating, [dict(user_id=user_id, anime_id=anime_id, score=score)], session)
+            await session.execute(
+                update(Rating)
+                .where(Rating.anime_id == anime_id)
+                .values(avg_rating=self.avg_rating_expression(mean))
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        except IntegrityError as e:
+            await session.rollback()
+            if self.missing_reference(e) != "anime":
+                raise
+            return None
+        return await self.get_user_stats(session=session, anime_id=anime_id)
+
+    async def get_user_stats(self, session: AsyncSession, anime_id: int) -> dict:
+        row = (await session.execute(
+            select(Rating.user_rating_count, Rating.user_rating_sum, Rating.avg_rating)
+            .where(Rating.anime_id == anime_id)
+        )).first()
+        count, total, avg_rating = row or (0, 0, None)
+        return dict(
+            count=count,
+            average=round(total / count, 2) if count else None,
+            avg_rating=avg_rating,
+        )
+
+    async def recompute_avg_rating(self, session: AsyncSession, chunk_size: int | None = None) -> dict:
+        """
+        Recompute `avg_rating` as the weighted mean of the source ratings (see `weighted_sums`) shrunk towards
+        the catalogue mean by `settings.rating_prior_weight`:
+
+            (prior_weight * mean + sum(weight * rating)) / (prior_weight + sum(weight))
+
+        Runs in Postgres in anime id chunks, one transaction per chunk, and only
+        writes rows whose rounded value changed.
+        """
+        chunk_size = chunk_size or settings.bulk_chunk_size
+        started = perf_counter()
+        mean = await self.catalogue_mean(session, cached=False)
+        avg_rating = self.avg_rating_expression(mean)
+
+        scanned = updated = 0
+        last_id = None
+        while True:
+            stmt = select(Rating.anime_id).order_by(Rating.anime_id).limit(chunk_size)
+            if last_id is not None:
+                stmt = stmt.where(Rating.anime_id > last_id)
+            ids = (await session.scalars(stmt)).all()
+            if not ids:
+                break
+            result = await session.execute(
+                update(Rating)
+                .where(Rating.anime_id.between(ids[0], ids[-1]), Rating.avg_rating.is_distinct_from(avg_rating))
+                .values(avg_rating=avg_rating)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            scanned += len(ids)
+            updated += result.rowcount
+            last_id = ids[-1]
+
+        elapsed = perf_counter() - started
+        return dict(
+            scanned=scanned,
+            updated=updated,
+            mean=round(mean, 4),
+            seconds=round(elapsed, 3),
+            rows_per_second=round(scanned / elapsed) if elapsed else scanned,
+        )
+
+
+rating_crud = RatingCRUD(Rating, cache_namespaces=("anime", "chart"))
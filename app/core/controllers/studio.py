@@ -13,4 +13,4 @@ class StudioCRUD(
     """ Studio CRUD. """
 
 
-studio_crud = StudioCRUD(Studio)
+studio_crud = StudioCRUD(Studio, cache_namespaces=("studio", "anime"))
@@ -1,9 +1,22 @@
-from sqlalchemy import select, or_, and_
+from array import array
+from typing_extensions import Any
+
+from sqlalchemy import select, delete, or_, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from pydantic import BaseModel
 
-from app.core.models.user import User, UserList
-from app.core.schemas.user import UserCreate, UserListCreate, UserUpdate, UserListUpdate
+from app.core.models.user import User, UserList, UserListCount
+from app.core.schemas.user import UserCreate, UserListCreate, UserUpdate, UserListUpdate, UserListChange
 from app.core.controllers.base import CRUDBase
+from app.core.cache import TTLCache
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.recommendations import build_model
+from app.core.compute import compute_pool
+from app.core.settings import settings
+
+ROLE_CACHE = TTLCache(ttl=settings.role_cache_ttl, maxsize=10000)
 
 
 class UserCRUD(
@@ -15,14 +28,36 @@ class UserCRUD(
 ):
     """ User CRUD. """
 
-    async def get_by_creditionals(
-        self, session: AsyncSession, login_or_email: str, hashed_password: str,
-    ) -> User | None:
+    async def get_by_login(self, session: AsyncSession, login_or_email: str) -> User | None:
         db_obj = await session.scalars(
-            select(self.model).where(and_(or_(User.login == login_or_email, User.email == login_or_email), User.password == hashed_password))
+            select(self.model).where(or_(User.login == login_or_email, User.email == login_or_email))
         )
         return db_obj.first()
 
+    async def get_role(self, session: AsyncSession, id: int) -> str | None:
+        """
+        Role of the user, cached per worker for `settings.role_cache_ttl` seconds.
+        `update` and `remove` drop the entry only in the worker that served them, so other
+        workers, and every worker after a role change made directly in the database,
+        keep the old role until it expires.
+        """
+        role = ROLE_CACHE.get(id)
+        if role is None:
+            role = await session.scalar(select(User.role).where(User.id == id))
+            if role is not None:
+                ROLE_CACHE.set(id, role)
+        return role
+
+    async def update(self, db_obj: User, obj_in: UserUpdate | dict[str, Any], session: AsyncSession) -> User:
+        db_obj = await super().update(db_obj=db_obj, obj_in=obj_in, session=session)
+        ROLE_CACHE.delete(db_obj.id)
+        return db_obj
+
+    async def remove(self, db_obj: User, session: AsyncSession) -> User:
+        db_obj = await super().remove(db_obj=db_obj, session=session)
+        ROLE_CACHE.delete(db_obj.id)
+        return db_obj
+
     async def get_profile(
         self, session: AsyncSession, id: int
     ) -> User:
@@ -38,14 +73,107 @@ class UserListCRUD(CRUDBase[UserList, UserListCreate, UserListUpdate]):
     """ User list CRUD. """
 
     async def get_user_list(
-        self, session: AsyncSession, user_id: int
-    ) -> list[UserList]:
-        stmt = (
-            select(User)
-            .where(User.id == user_id)
+        self, session: AsyncSession, user_id: int, filter: BaseModel
+    ) -> tuple[list[UserList], int, str | None]:
+        """
+        One page of the user's list ordered by anime id, continued by keyset from `filter.cursor`.
+        """
+        stmt = select(UserList).where(UserList.user_id == user_id)
+        if filter.status is not None:
+            stmt = stmt.where(UserList.status == filter.status)
+        total = await self.count(session, stmt, "exact")
+        if filter.cursor:
+            _, last_anime_id = decode_cursor(filter.cursor, "anime_id", "asc")
+            stmt = stmt.where(UserList.anime_id > last_anime_id)
+        stmt = stmt.options(selectinload(UserList.anime)).order_by(UserList.anime_id).limit(filter.limit + 1)
+        db_objs = (await session.scalars(stmt)).all()
+        has_next = len(db_objs) > filter.limit
+        db_objs = db_objs[:filter.limit]
+        next_cursor = None
+        if has_next and db_objs:
+            next_cursor = encode_cursor("anime_id", "asc", None, db_objs[-1].anime_id)
+        return db_objs, total, next_cursor
+
+    async def apply_changes(
+        self, session: AsyncSession, user_id: int, changes: list[UserListChange]
+    ) -> dict[str, int] | None:
+        """
+        Apply all changes in one transaction, the last change of an anime wins.
+        Returns None, with nothing applied, when one of the anime does not exist.
+        """
+        statuses = {change.anime_id: change.status for change in changes}
+        try:
+            await self.upsert_rows(UserList, [
+                dict(user_id=user_id, anime_id=anime_id, status=status)
+                for anime_id, status in statuses.items() if status is not None
+            ], session)
+            removed = [anime_id for anime_id, status in statuses.items() if status is None]
+            if removed:
+                await session.execute(
+                    delete(UserList).where(UserList.user_id == user_id, UserList.anime_id.in_(removed))
+                )
+            await session.commit()
+        except IntegrityError as e:
+            await session.rollback()
+            if self.missing_reference(e) != "anime":
+                raise
+            return None
+        return await self.get_counts(session=session, user_id=user_id)
+
+    async def get_counts(self, session: AsyncSession, user_id: int) -> dict[str, int]:
+        result = await session.execute(
+            select(UserListCount.status, UserListCount.count)
+            .where(UserListCount.user_id == user_id, UserListCount.count > 0)
         )
-        db_obj = await session.scalars(stmt)
-        return db_obj.one().user_list
+        return dict(result.all())
+
+    async def get_seen(self, session: AsyncSession, user_id: int) -> list[int]:
+        result = await session.scalars(select(UserList.anime_id).where(UserList.user_id == user_id))
+        return result.all()
+
+    async def get_list_entries(self, session: AsyncSession) -> tuple[array, array]:
+        """
+        (user ids, anime ids) of every list entry, streamed in partitions so no row objects pile up.
+        """
+        user_ids, anime_ids = array("i"), array("i")
+        result = await session.stream(
+            select(UserList.user_id, UserList.anime_id).execution_options(yield_per=settings.bulk_chunk_size * 20)
+        )
+        async for partition in result.partitions():
+            for user_id, anime_id in partition:
+                user_ids.append(user_id)
+                anime_ids.append(anime_id)
+        return user_ids, anime_ids
+
+    async def build_recommendations(
+        self, session: AsyncSession, read_session: AsyncSession | None = None, min_interval: int | None = None
+    ) -> int | None:
+        """
+        Rebuild the file behind `recommendation_model` unless another worker is already doing it or,
+        with `min_interval`, did it less than `min_interval` seconds ago. List entries are read in
+        `read_session` when given and the model is built in `compute_pool`. Returns the number of
+        anime in the file, None when skipped.
+        """
+        started = await session.scalar(text("SELECT pg_try_advisory_xact_lock(hashtext('user_recommendations'))"))
+        if started and min_interval is not None:
+            started = not await session.scalar(
+                text("SELECT EXISTS (SELECT 1 FROM job_run WHERE name = 'user_recommendations'"
+                     " AND finished_at > now() - make_interval(secs => :interval))"),
+                {"interval": float(min_interval)},
+            )
+        count = None
+        if started:
+            user_ids, anime_ids = await self.get_list_entries(read_session or session)
+            count = await compute_pool.run(
+                build_model, settings.recommendations_path, user_ids, anime_ids,
+                settings.recommendations_neighbours, settings.recommendations_min_support,
+            )
+            await session.execute(text(
+                "INSERT INTO job_run (name, finished_at) VALUES ('user_recommendations', now())"
+                " ON CONFLICT (name) DO UPDATE SET finished_at = excluded.finished_at"
+            ))
+        await session.commit()
+        return count
 
 
 user_crud = UserCRUD(User)
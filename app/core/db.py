@@ -1,9 +1,18 @@
+from itertools import count
+from time import perf_counter, time
 from typing_extensions import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from fastapi import Request, Response
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, declared_attr
 from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from app.core.logger import logging
+from app.core.metrics import DB_POOL_WAIT, observe_query
 from app.core.settings import settings
 
 
@@ -21,15 +30,180 @@ Base = declarative_base(
     cls=PreBase,
 )
 
-engine = create_async_engine(
-    settings.postgres_url, poolclass=AsyncAdaptedQueuePool, pool_pre_ping=True
-)
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that counts callers waiting for a connection and records how long checkouts take.
+    """
+
+    def __init__(self, creator, database: str = "primary", **kw) -> None:
+        super().__init__(creator, **kw)
+        self.database = database
+        self.waiting = 0
+        self.timeouts = 0
+        self.wait_time = DB_POOL_WAIT.labels(database)
+
+    def recreate(self) -> "InstrumentedPool":
+        pool = super().recreate()
+        pool.database, pool.timeouts, pool.wait_time = self.database, self.timeouts, self.wait_time
+        return pool
+
+    def _do_get(self):
+        self.waiting += 1
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+            self.wait_time.observe(perf_counter() - started)
+
+    @property
+    def stats(self) -> dict:
+        return dict(
+            size=self.size(),
+            checked_in=self.checkedin(),
+            checked_out=self.checkedout(),
+            overflow=self.overflow(),
+            max_overflow=self._max_overflow,
+            waiting=self.waiting,
+            timeouts=self.timeouts,
+            wait_seconds=self.wait_time.stats,
+        )
+
+
+def instrument(engine: AsyncEngine, database: str) -> None:
+    """
+    Time every query and count it, with its rows, towards the current request.
+    """
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        observe_query(database, perf_counter() - conn.info.pop("query_started"), max(cursor.rowcount, 0))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+def create_engine(url: str, database: str = "primary") -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedPool,
+        database=database,
+        pool_size=settings.postgres_pool_size,
+        max_overflow=settings.postgres_max_overflow,
+        pool_timeout=settings.postgres_pool_timeout,
+        pool_recycle=settings.postgres_pool_recycle,
+        pool_pre_ping=settings.postgres_pool_pre_ping,
+        connect_args={
+            "statement_cache_size": settings.postgres_statement_cache_size,
+            "prepared_statement_cache_size": settings.postgres_statement_cache_size,
+        },
+    )
+    if settings.metrics_enabled:
+        instrument(engine, database)
+    return engine
+
+
+engine = create_engine(settings.postgres_url)
 
 AsyncSessionLocal = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+READ_PRIMARY_COOKIE = "read_primary_until"
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
 
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+class Replica:
+    def __init__(self, url: str) -> None:
+        parsed = make_url(url)
+        self.name = parsed.render_as_string(hide_password=True)
+        self.engine = create_engine(url, database=f"{parsed.host}:{parsed.port or 5432}")
+        self.sessionmaker = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        self.lag: float | None = None
+        self.healthy = True
+
+    @property
+    def stats(self) -> dict:
+        return dict(name=self.name, healthy=self.healthy, lag=self.lag, pool=self.engine.pool.stats)
+
+
+class ReplicaRouter:
+    """
+    Picks the least busy healthy replica, round-robin between equally busy ones.
+    A replica is skipped while its replay lag exceeds `settings.postgres_replica_max_lag`
+    or it cannot be reached, reads fall back to the primary when none is left.
+    """
+
+    def __init__(self, urls: list[str]) -> None:
+        self.replicas = [Replica(url) for url in urls]
+        self._turn = count()
+
+    def pick(self) -> Replica | None:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        start = next(self._turn) % len(healthy)
+        rotated = healthy[start:] + healthy[:start]
+        return min(rotated, key=lambda replica: replica.engine.pool.checkedout())
+
+    async def check_lag(self) -> None:
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as connection:
+                    replica.lag = float(await connection.scalar(REPLICA_LAG_QUERY) or 0)
+                healthy = replica.lag <= settings.postgres_replica_max_lag
+            except Exception as e:
+                logging.error(e, exc_info=True)
+                replica.lag, healthy = None, False
+            if healthy != replica.healthy:
+                logging.warning(f"Replica {replica.name} is {'back' if healthy else 'skipped'}, lag {replica.lag}")
+            replica.healthy = healthy
+
+    async def close(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+replica_router = ReplicaRouter(settings.postgres_replica_urls)
+
+
+async def get_async_session(request: Request, response: Response) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Primary session. Writes pin the client's reads to the primary for
+    `settings.postgres_read_after_write` seconds, so it sees its own changes.
+    """
+    if replica_router.replicas and request.method != "GET":
+        response.set_cookie(
+            READ_PRIMARY_COOKIE, str(int(time() + settings.postgres_read_after_write)),
+            max_age=settings.postgres_read_after_write, httponly=True, samesite="lax",
+        )
     async with AsyncSessionLocal() as async_session:
         yield async_session
+
+
+def reads_pinned(request: Request) -> bool:
+    """
+    Whether the client wrote recently and must read from the primary.
+    """
+    pinned_until = request.cookies.get(READ_PRIMARY_COOKIE, "")
+    return pinned_until.isdigit() and int(pinned_until) > time()
+
+
+async def get_async_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for read-only routes, on a replica when one is configured and healthy.
+    `request.state.replica` tells the response cache whether the data may lag.
+    """
+    replica = replica_router.pick()
+    request.state.replica = replica is not None and not reads_pinned(request)
+    sessionmaker = replica.sessionmaker if request.state.replica else AsyncSessionLocal
+    async with sessionmaker() as async_session:
+        yield async_session
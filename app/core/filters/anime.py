@@ -1,6 +1,6 @@
 from typing_extensions import Literal
 
-from pydantic import Field
+from pydantic import Field, BaseModel
 from fastapi import Query
 
 from app.core.filters.base import BaseIdNameFilter
@@ -15,4 +15,22 @@ class AnimeFilter(BaseIdNameFilter):
     age: str | None = Field(Query(default=None, description="age"))
     url: str | None = Field(Query(default=None, description="url"))
     genre: str | None = Field(Query(default=None, description="genre"))
+    search: str | None = Field(Query(default=None, description="search by name and alternative names", min_length=1))
     order_by: Literal["relevance", "year", "name"] | None = Field(Query(default="relevance", description="order_by"))
+    view: Literal["full", "card"] = Field(Query(default="full", description="full objects or lightweight cards"))
+    pagination: Literal["offset", "cursor"] = Field(Query(default="offset", description="pagination mode"))
+    cursor: str | None = Field(Query(default=None, description="next_cursor of the previous page"))
+
+
+class AnimeChartFilter(BaseModel):
+    limit: int = Field(Query(default=100, description="limit", ge=0, le=100))
+    year: int | None = Field(Query(default=None, description="year", ge=1900))
+    type: str | None = Field(Query(default=None, description="type"))
+    genre: str | None = Field(Query(default=None, description="genre"))
+
+
+class AnimeRandomFilter(BaseModel):
+    year: int | None = Field(Query(default=None, description="year", ge=1900))
+    type: str | None = Field(Query(default=None, description="type"))
+    genre: str | None = Field(Query(default=None, description="genre"))
+    min_rating: float | None = Field(Query(default=None, description="minimal avg_rating", ge=0, le=10))
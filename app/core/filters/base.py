@@ -9,6 +9,10 @@ from app.core.schemas.base import BaseModelConfig
 class BaseFilter(BaseModelConfig):
     limit: int = Field(Query(default=100, description="limit", ge=0, le=100))
     offset: int = Field(Query(default=0, description="offset"))
+    with_total: bool = Field(Query(default=True, description="compute total"))
+    total_strategy: Literal["exact", "estimated", "cached"] = Field(
+        Query(default="exact", description="how total is computed")
+    )
 
 
 class BaseIdNameFilter(BaseFilter):
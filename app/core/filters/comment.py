@@ -0,0 +1,13 @@
+from pydantic import Field, BaseModel
+from fastapi import Query
+
+
+class CommentThreadFilter(BaseModel):
+    limit: int = Field(Query(default=20, description="threads per page", ge=0, le=100))
+    cursor: str | None = Field(Query(default=None, description="next_cursor of the previous page"))
+    replies: int = Field(Query(default=3, description="replies loaded with each thread", ge=0, le=20))
+
+
+class CommentReplyFilter(BaseModel):
+    limit: int = Field(Query(default=20, description="replies per page", ge=0, le=100))
+    cursor: str | None = Field(Query(default=None, description="next_cursor of the previous page"))
@@ -0,0 +1,8 @@
+from pydantic import Field, BaseModel
+from fastapi import Query
+
+
+class UserListFilter(BaseModel):
+    status: str | None = Field(Query(default=None, description="status"))
+    limit: int = Field(Query(default=50, description="limit", ge=0, le=100))
+    cursor: str | None = Field(Query(default=None, description="next_cursor of the previous page"))
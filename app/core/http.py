@@ -0,0 +1,66 @@
+"""
+This module contains the shared async HTTP client for outbound integrations.
+"""
+
+import asyncio
+
+import httpx
+
+from app.core.settings import settings
+
+RETRY_STATUS_CODES = {502, 503, 504}
+
+
+class HTTPClient:
+    """
+    One pooled keep-alive `httpx.AsyncClient` per worker, opened and closed by the app lifespan.
+
+    Connection failures are retried for every method, GET requests are also
+    retried on timeouts and gateway errors.
+    """
+
+    def __init__(self) -> None:
+        self._client: httpx.AsyncClient | None = None
+
+    async def start(self) -> None:
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.http_client_timeout),
+            limits=httpx.Limits(
+                max_connections=settings.http_client_max_connections,
+                max_keepalive_connections=settings.http_client_max_connections,
+            ),
+            transport=httpx.AsyncHTTPTransport(retries=settings.http_client_retries),
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("HTTP client is not started")
+        return self._client
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        attempts = settings.http_client_retries + 1 if method == "GET" else 1
+        for attempt in range(attempts):
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TimeoutException:
+                if attempt == attempts - 1:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt == attempts - 1:
+                    return response
+            await asyncio.sleep(0.1 * 2 ** attempt)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+
+http_client = HTTPClient()
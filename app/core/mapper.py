@@ -13,13 +13,17 @@ class BaseResponseDataMapper:
     data: list
     limit: int = 100
     offset: int = 0
-    total: int = 0
+    total: int | None = 0
+    total_strategy: str = "exact"
+    next_cursor: str | None = None
 
     @property
     def result_schema(self) -> Generic[PydanticModel]:
         return dict(
             responses=self.data,
             total=self.total,
+            total_strategy=self.total_strategy if self.total is not None else "none",
             limit=self.limit,
             offset=self.offset,
+            next_cursor=self.next_cursor,
         )
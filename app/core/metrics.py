@@ -0,0 +1,255 @@
+"""
+This module contains in-process metrics: primitives shared by the internal endpoints,
+the request instrumentation and the Prometheus text exposition behind `/metrics`.
+"""
+
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from typing_extensions import TypeVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of seconds, cumulative like Prometheus `le` buckets.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        result, total = [], 0
+        for bound, count in zip((*map(str, self.buckets), "+Inf"), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    @property
+    def stats(self) -> dict:
+        return dict(count=self.count, sum=round(self.sum, 6), buckets=dict(self.cumulative()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Metric:
+    """
+    A metric family: one value per combination of label values.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+
+    def set(self, value: float, *labels) -> None:
+        self.values[labels] = value
+
+    def inc(self, *labels, value: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in self.values.items()]
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}", *self.samples()]
+
+
+class Counter(Metric):
+    type = "counter"
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+
+class HistogramMetric(Metric):
+    type = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+        self.children: dict[tuple, Histogram] = {}
+
+    def labels(self, *labels) -> Histogram:
+        child = self.children.get(labels)
+        if child is None:
+            child = self.children[labels] = Histogram(self.buckets)
+        return child
+
+    def observe(self, value: float, *labels) -> None:
+        self.labels(*labels).observe(value)
+
+    def samples(self) -> list[str]:
+        lines = []
+        bucket_names = (*self.labelnames, "le")
+        for labels, child in self.children.items():
+            for bound, total in child.cumulative():
+                lines.append(f"{self.name}_bucket{_labels(bucket_names, (*labels, bound))} {total}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {child.sum}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {child.count}")
+        return lines
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: M) -> M:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "Finished HTTP requests.", ("method", "route", "status")
+))
+HTTP_DURATION = registry.register(HistogramMetric(
+    "http_request_duration_seconds", "Time from the request to the last response byte.", ("method", "route")
+))
+HTTP_DB_QUERIES = registry.register(HistogramMetric(
+    "http_request_db_queries", "Database queries per request.", ("route",), QUERY_BUCKETS
+))
+HTTP_DB_ROWS = registry.register(HistogramMetric(
+    "http_request_db_rows", "Rows returned or affected per request.", ("route",), ROW_BUCKETS
+))
+HTTP_DB_DURATION = registry.register(HistogramMetric(
+    "http_request_db_seconds", "Time per request spent in database queries.", ("route",)
+))
+HTTP_SERIALIZATION = registry.register(HistogramMetric(
+    "http_response_serialization_seconds", "Time per request spent serializing fast responses.", ("route",)
+))
+DB_QUERY_DURATION = registry.register(HistogramMetric(
+    "db_query_duration_seconds", "Database query time.", ("database",)
+))
+DB_POOL_WAIT = registry.register(HistogramMetric(
+    "db_pool_wait_seconds", "Time to check out a database connection.", ("database",)
+))
+DB_POOL_CHECKED_OUT = registry.register(Gauge(
+    "db_pool_checked_out", "Database connections in use.", ("database",)
+))
+DB_POOL_SIZE = registry.register(Gauge(
+    "db_pool_size", "Database connections held, in use or idle.", ("database",)
+))
+DB_POOL_WAITING = registry.register(Gauge(
+    "db_pool_waiting", "Callers waiting for a database connection.", ("database",)
+))
+DB_POOL_TIMEOUTS = registry.register(Counter(
+    "db_pool_timeouts_total", "Connection checkouts that timed out.", ("database",)
+))
+
+
+class RequestStats:
+    __slots__ = ("queries", "rows", "db_seconds", "serialization_seconds")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.rows = 0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+
+
+REQUEST_STATS: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def observe_query(database: str, seconds: float, rows: int) -> None:
+    DB_QUERY_DURATION.observe(seconds, database)
+    stats = REQUEST_STATS.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.rows += rows
+        stats.db_seconds += seconds
+
+
+def observe_serialization(seconds: float) -> None:
+    stats = REQUEST_STATS.get()
+    if stats is not None:
+        stats.serialization_seconds += seconds
+
+
+class MetricsMiddleware:
+    """
+    Records per-route request metrics. Routes are labelled by their path template,
+    so `/api/anime/{id}` is one series whatever the id.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._routes: dict = {}
+
+    def route_name(self, scope: Scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        name = self._routes.get(endpoint)
+        if name is None:
+            for route in scope["app"].routes:
+                self._routes[getattr(route, "endpoint", None)] = getattr(route, "path", UNMATCHED_ROUTE)
+            name = self._routes.setdefault(endpoint, UNMATCHED_ROUTE)
+        return name
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = REQUEST_STATS.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - started
+            REQUEST_STATS.reset(token)
+            route, method = self.route_name(scope), scope["method"]
+            HTTP_REQUESTS.inc(method, route, status_code)
+            HTTP_DURATION.observe(elapsed, method, route)
+            HTTP_DB_QUERIES.observe(stats.queries, route)
+            HTTP_DB_ROWS.observe(stats.rows, route)
+            HTTP_DB_DURATION.observe(stats.db_seconds, route)
+            if stats.serialization_seconds:
+                HTTP_SERIALIZATION.observe(stats.serialization_seconds, route)
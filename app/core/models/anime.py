@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from sqlalchemy import Integer, ForeignKey, String
+from sqlalchemy import Integer, ForeignKey, String, func
+from sqlalchemy.sql.elements import ColumnElement
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import ARRAY
 
@@ -104,3 +105,10 @@ class Anime(Base):
     studios: Mapped[list[Studio]] = relationship(secondary="anime_studio", lazy="selectin", viewonly=True)
     poster: Mapped[Poster] = relationship(lazy="selectin", viewonly=True)
     rating: Mapped[Rating] = relationship(lazy="selectin", viewonly=True)
+
+    @classmethod
+    def search_text(cls) -> ColumnElement[str]:
+        """
+        Lowercased name and alternative names, matches the `ix_anime_search_trgm` index expression.
+        """
+        return func.anime_search_text(cls.name, cls.alternative_names)
@@ -0,0 +1,22 @@
+from sqlalchemy import Integer, Float, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+
+class AnimeChart(Base):
+    """ Materialized view, refreshed by `AnimeCRUD.refresh_chart`. """
+
+    __tablename__ = "anime_chart"
+
+    anime_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("anime.id"),
+        primary_key=True,
+    )
+    position: Mapped[int] = mapped_column(
+        Integer,
+    )
+    avg_rating: Mapped[float] = mapped_column(
+        Float,
+    )
@@ -21,7 +21,7 @@ class Comment(Base):
     )
     comment_date: Mapped[datetime] = mapped_column(
         DateTime,
-        default=datetime.now(),
+        default=datetime.now,
     )
     anime_id: Mapped[int] = mapped_column(
         Integer,
@@ -36,4 +36,10 @@ class Comment(Base):
         ForeignKey("comment.id"),
         nullable=True,
     )
+    reply_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+    )
     user: Mapped[User] = relationship(lazy="selectin", viewonly=True)
+    # Filled by `CommentCRUD.get_threads`, never loaded implicitly.
+    replies: Mapped[list[Comment]] = relationship(lazy="raise", viewonly=True)
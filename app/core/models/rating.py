@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, Float, ForeignKey
+from sqlalchemy import Integer, SmallInteger, Float, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.core.db import Base
@@ -30,3 +30,31 @@ class Rating(Base):
     avg_rating: Mapped[float] = mapped_column(
         Float,
     )
+    user_rating_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+    )
+    user_rating_sum: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+    )
+
+
+class UserRating(Base):
+    """ Aggregated into `Rating` by the `user_rating_aggregate_trigger` trigger. """
+
+    __tablename__ = "user_rating"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("user.id"),
+        primary_key=True,
+    )
+    anime_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("anime.id"),
+        primary_key=True,
+    )
+    score: Mapped[int] = mapped_column(
+        SmallInteger,
+    )
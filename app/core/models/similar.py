@@ -0,0 +1,23 @@
+from sqlalchemy import Integer, Float, ForeignKey
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+
+class AnimeSimilar(Base):
+    """ Top-K neighbours of an anime, rebuilt by `AnimeCRUD.rebuild_similar`. """
+
+    __tablename__ = "anime_similar"
+
+    anime_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("anime.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    similar_ids: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer),
+    )
+    scores: Mapped[list[float]] = mapped_column(
+        ARRAY(Float(precision=24)),
+    )
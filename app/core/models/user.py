@@ -44,7 +44,7 @@ class User(Base):
         Date,
         default=date.today()
     )
-    user_list: Mapped[list[UserList]] = relationship(lazy="selectin")
+    user_list: Mapped[list[UserList]] = relationship(lazy="raise")
 
 
 class UserList(Base):
@@ -64,4 +64,24 @@ class UserList(Base):
         String,
     )
 
-    anime: Mapped[Anime] = relationship(lazy="selectin")
+    anime: Mapped[Anime] = relationship(lazy="raise")
+
+
+class UserListCount(Base):
+    """ Maintained by the `user_list_count_trigger` trigger on `user_list`. """
+
+    __tablename__ = "user_list_count"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("user.id"),
+        primary_key=True,
+    )
+    status: Mapped[str] = mapped_column(
+        String,
+        primary_key=True,
+    )
+    count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+    )
@@ -0,0 +1,31 @@
+import base64
+import binascii
+
+import orjson
+from fastapi import HTTPException, status
+
+INVALID_CURSOR_EXCEPTION = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid cursor",
+)
+
+
+def encode_cursor(order_by: str, direction: str, value: str | int | float | None, obj_id: int) -> str:
+    """
+    Pack the last seen (sort_key, id) pair into an opaque url-safe token.
+    """
+    payload = orjson.dumps([order_by, direction, value, obj_id])
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str, direction: str) -> tuple[str | int | float | None, int]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_order_by, cursor_direction, value, obj_id = orjson.loads(payload)
+    except (binascii.Error, orjson.JSONDecodeError, ValueError, TypeError):
+        raise INVALID_CURSOR_EXCEPTION
+    if (cursor_order_by, cursor_direction) != (order_by, direction) or not isinstance(obj_id, int):
+        raise INVALID_CURSOR_EXCEPTION
+    if value is not None and (isinstance(value, bool) or not isinstance(value, (str, int, float))):
+        raise INVALID_CURSOR_EXCEPTION
+    return value, obj_id
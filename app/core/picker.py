@@ -0,0 +1,51 @@
+"""
+This module contains an in-memory set of anime ids with O(1) uniform sampling.
+"""
+
+import random
+
+
+class RandomPicker:
+    """
+    Keeps ids in a dense list plus a position map, so add, remove and pick are O(1).
+    Each worker holds its own copy, resynced from the database by `sync`: until then titles
+    added through another worker are not picked, and removed ones are dropped by the id lookup.
+    """
+
+    def __init__(self) -> None:
+        self._ids: list[int] = []
+        self._positions: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, id: int) -> None:
+        if id in self._positions:
+            return
+        self._positions[id] = len(self._ids)
+        self._ids.append(id)
+
+    def remove(self, id: int) -> None:
+        position = self._positions.pop(id, None)
+        if position is None:
+            return
+        last_id = self._ids.pop()
+        if last_id != id:
+            self._ids[position] = last_id
+            self._positions[last_id] = position
+
+    def sync(self, ids) -> None:
+        """
+        Make the set match `ids`.
+        """
+        ids = set(ids)
+        for id in self._positions.keys() - ids:
+            self.remove(id)
+        for id in ids:
+            self.add(id)
+
+    def sample(self, count: int = 1) -> list[int]:
+        return random.sample(self._ids, min(count, len(self._ids)))
+
+
+random_picker = RandomPicker()
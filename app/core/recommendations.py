@@ -0,0 +1,180 @@
+"""
+This module contains the item-item model behind personal recommendations,
+stored in a flat file that workers map into memory.
+"""
+
+import heapq
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing_extensions import Iterable
+
+import numpy as np
+from scipy import sparse
+
+MAGIC = b"ANRC"
+VERSION = 1
+HEADER = struct.Struct("<4sIII")
+# Anime scored per sparse product, bounds the dense count block to CHUNK_SIZE x anime.
+CHUNK_SIZE = 256
+
+
+def item_neighbours(
+    user_ids: Iterable[int], anime_ids: Iterable[int], k: int, min_support: int
+) -> list[tuple[int, int, float]]:
+    """
+    Top `k` (anime_id, other_id, score) per anime from (user_id, anime_id) list entries, grouped
+    by anime_id ascending and best first. The score is the number of lists holding both titles
+    over the geometric mean of their list counts (cosine of the user-anime matrix columns),
+    pairs shared by fewer than `min_support` lists are dropped.
+    """
+    users, user_index = np.unique(np.asarray(user_ids, dtype=np.int64), return_inverse=True)
+    anime, anime_index = np.unique(np.asarray(anime_ids, dtype=np.int64), return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(anime_index), dtype=np.float32), (anime_index, user_index)), shape=(len(anime), len(users))
+    )
+    # Repeated entries were summed, a list holds a title once.
+    matrix.data[:] = 1
+    transposed = matrix.T.tocsr()
+    norms = np.sqrt(np.asarray(matrix.sum(axis=1)).ravel())
+    rows = []
+    for start in range(0, len(anime), CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, len(anime))
+        counts = (matrix[start:stop] @ transposed).toarray()
+        counts[np.arange(stop - start), np.arange(start, stop)] = 0
+        scores = counts / norms[start:stop, None] / norms
+        scores[counts < min_support] = 0
+        if k < scores.shape[1]:
+            candidates = np.argpartition(-scores, k, axis=1)[:, :k]
+        else:
+            candidates = np.tile(np.arange(scores.shape[1]), (stop - start, 1))
+        for row in range(stop - start):
+            columns = candidates[row]
+            values = scores[row, columns]
+            order = np.argsort(-values, kind="stable")
+            rows.extend(
+                (int(anime[start + row]), int(anime[column]), float(value))
+                for column, value in zip(columns[order], values[order]) if value > 0
+            )
+    return rows
+
+
+def write_model(path: str, rows: Iterable[tuple[int, int, float]], k: int) -> int:
+    """
+    Write (anime_id, other_id, score) rows, grouped by anime_id and best first, as
+
+        header | anime ids int32[n] | neighbour ids int32[n * k] | scores float32[n * k]
+
+    with unused neighbour slots set to -1. The file is replaced atomically.
+    Returns the number of anime.
+    """
+    ids, neighbours, scores = array("i"), array("i"), array("f")
+    filled = k
+    for anime_id, other_id, score in rows:
+        if not ids or ids[-1] != anime_id:
+            neighbours.extend([-1] * (k - filled))
+            scores.extend([0.0] * (k - filled))
+            ids.append(anime_id)
+            filled = 0
+        if filled < k:
+            neighbours.append(other_id)
+            scores.append(score)
+            filled += 1
+    if ids:
+        neighbours.extend([-1] * (k - filled))
+        scores.extend([0.0] * (k - filled))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(ids), k))
+        ids.tofile(file)
+        neighbours.tofile(file)
+        scores.tofile(file)
+    os.replace(tmp_path, path)
+    return len(ids)
+
+
+def build_model(path: str, user_ids: Iterable[int], anime_ids: Iterable[int], k: int, min_support: int) -> int:
+    """
+    `item_neighbours` written by `write_model`. CPU bound, meant to run in a worker process.
+    """
+    return write_model(path, item_neighbours(user_ids, anime_ids, k, min_support), k)
+
+
+class RecommendationModel:
+    """
+    Read-only view of a file written by `write_model`. Lookups bisect the sorted
+    anime ids and read the neighbour slices straight from the mapping, so the
+    model costs no heap and is shared by all workers through the page cache.
+    """
+
+    def __init__(self) -> None:
+        self.path: str | None = None
+        self._mtime: float | None = None
+        self._ids: memoryview | None = None
+        self._neighbours: memoryview | None = None
+        self._scores: memoryview | None = None
+        self.k = 0
+
+    def __len__(self) -> int:
+        return len(self._ids) if self._ids is not None else 0
+
+    def load(self, path: str) -> bool:
+        self.path = path
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return False
+        with open(path, "rb") as file:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n, k = HEADER.unpack_from(mapping)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a recommendation model")
+        view = memoryview(mapping)
+        offset = HEADER.size
+        self._ids = view[offset:offset + 4 * n].cast("i")
+        offset += 4 * n
+        self._neighbours = view[offset:offset + 4 * n * k].cast("i")
+        offset += 4 * n * k
+        self._scores = view[offset:offset + 4 * n * k].cast("f")
+        self.k, self._mtime = k, mtime
+        return True
+
+    def reload_if_changed(self) -> None:
+        """
+        Pick up a file rebuilt by any worker, a cheap `stat` when nothing changed.
+        """
+        if self.path is None:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            self.load(self.path)
+
+    def recommend(self, seen: Iterable[int], limit: int) -> list[int]:
+        """
+        Unseen anime ranked by the summed similarity to everything in `seen`.
+        """
+        if self._ids is None:
+            return []
+        seen = set(seen)
+        ids, neighbours, scores, k = self._ids, self._neighbours, self._scores, self.k
+        totals = defaultdict(float)
+        for anime_id in seen:
+            position = bisect_left(ids, anime_id)
+            if position == len(ids) or ids[position] != anime_id:
+                continue
+            start = position * k
+            for other_id, score in zip(neighbours[start:start + k], scores[start:start + k]):
+                if other_id == -1:
+                    break
+                if other_id not in seen:
+                    totals[other_id] += score
+        return [anime_id for anime_id, _ in heapq.nlargest(limit, totals.items(), key=lambda item: item[1])]
+
+
+recommendation_model = RecommendationModel()
@@ -3,7 +3,7 @@ from typing_extensions import Type
 from pydantic import Field, BaseModel
 
 from app.core.schemas.base import BaseModelConfig
-from app.core.schemas.poster import PosterBase
+from app.core.schemas.poster import PosterBase, PosterSmallBase
 from app.core.schemas.studio import StudioBase
 from app.core.schemas.rating import RatingBase
 from app.core.schemas.director import DirectorBase
@@ -35,6 +35,19 @@ class AnimeCreate(AnimeBase):
     ...
 
 
+class AnimeBulkItem(AnimeCreate):
+    """
+    Related lists replace the current links when given, `None` keeps them.
+    """
+
+    id: int
+    poster: PosterBase | None = None
+    rating: RatingBase | None = None
+    genres: list[int] | None = None
+    directors: list[int] | None = None
+    studios: list[int] | None = None
+
+
 class AnimeResponseBase(AnimeBase):
     id: int
     poster: PosterBase | None
@@ -44,4 +57,21 @@ class AnimeResponseBase(AnimeBase):
     studios: list[StudioBase] | None = Field(default_factory=list)
 
 
+class AnimeSuggestResponseBase(BaseModelConfig):
+    id: int
+    name: str
+    poster: PosterSmallBase | None
+
+
+class AnimeCardResponseBase(BaseModelConfig):
+    id: int
+    name: str
+    url: str | None
+    year: int | None
+    type: str | None
+    poster: str | None
+    avg_rating: float | None
+
+
 AnimeResponse: Type[BaseModel] = create_response_model(AnimeResponseBase, "AnimeResponse")
+AnimeCardResponse: Type[BaseModel] = create_response_model(AnimeCardResponseBase, "AnimeCardResponse")
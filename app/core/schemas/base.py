@@ -22,9 +22,11 @@ def create_response_model(schema: PydanticModel, model_name: str) -> PydanticMod
     return create_model(
         model_name,
         responses=(list[schema], ...),
-        total=(int, Field(...)),
+        total=(int | None, Field(...)),
+        total_strategy=(str, Field(default="exact")),
         limit=(int, Field(...)),
         offset=(int, Field(...)),
+        next_cursor=(str | None, Field(default=None)),
         __base__=BaseModelConfig,
         __module__="",
     )
@@ -24,12 +24,19 @@ class CommentUpdate(CommentBase):
 class CommentCreate(BaseModelConfig):
     message: str
     anime_id: int | None
+    parent: int | None = None
 
 
 class CommentResponseBase(CommentBase):
     id: int
     user: UserPublicResponseBase | None = Field(default_factory=list)
     comment_date: datetime
+    reply_count: int | None = 0
+
+
+class CommentThreadResponseBase(CommentResponseBase):
+    replies: list[CommentResponseBase] = Field(default_factory=list)
 
 
 CommentResponse: Type[BaseModel] = create_response_model(CommentResponseBase, "CommentResponse")
+CommentThreadResponse: Type[BaseModel] = create_response_model(CommentThreadResponseBase, "CommentThreadResponse")
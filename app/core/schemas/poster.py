@@ -9,12 +9,16 @@ from app.core.schemas.base import (
 
 
 class PosterBase(BaseModelConfig):
-    anime_id: int | None
-    fullsize: str | None
-    big: str | None
+    anime_id: int | None = None
+    fullsize: str | None = None
+    big: str | None = None
+    small: str | None = None
+    medium: str | None = None
+    huge: str | None = None
+
+
+class PosterSmallBase(BaseModelConfig):
     small: str | None
-    medium: str | None
-    huge: str | None
 
 
 class PosterUpdate(PosterBase):
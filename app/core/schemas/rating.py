@@ -1,6 +1,6 @@
 from typing_extensions import Type
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.core.schemas.base import BaseModelConfig
 from app.core.schemas.base import (
@@ -9,13 +9,13 @@ from app.core.schemas.base import (
 
 
 class RatingBase(BaseModelConfig):
-    anime_id: int | None
-    kp_rating: float | None
-    shikimori_rating: float | None
-    anidub_rating: float | None
-    myanimelist_rating: float | None
-    worldart_rating: float | None
-    avg_rating: float | None
+    anime_id: int | None = None
+    kp_rating: float | None = None
+    shikimori_rating: float | None = None
+    anidub_rating: float | None = None
+    myanimelist_rating: float | None = None
+    worldart_rating: float | None = None
+    avg_rating: float | None = None
 
 
 class RatingUpdate(RatingBase):
@@ -26,4 +26,8 @@ class RatingCreateBase(RatingBase):
     ...
 
 
+class UserRatingScore(BaseModelConfig):
+    score: int = Field(ge=1, le=10)
+
+
 RatingResponse: Type[BaseModel] = create_response_model(RatingCreateBase, "RatingResponse")
@@ -20,6 +20,19 @@ class UserListBase(BaseModelConfig):
     status: str
 
 
+class UserListChange(BaseModelConfig):
+    """
+    `status=None` removes the anime from the list.
+    """
+
+    anime_id: int
+    status: str | None
+
+
+class UserListStatus(BaseModelConfig):
+    status: str
+
+
 class UserListCreate(UserListBase):
     ...
 
@@ -41,7 +54,6 @@ class UserPublic(UserBase):
 class UserPrivate(UserBase):
     email: str | None = None
     role: str | None = None
-    user_list: list[AnimeList] | None = Field(alias="animeList", default_factory=list)
     vk_id: int | None = Field(alias="vkId", default=None)
 
 
@@ -80,3 +92,4 @@ class RegistrationSchema(LoginSchema):
 
 
 UserResponse: Type[BaseModel] = create_response_model(UserResponseBase, "UserResponse")
+UserListResponse: Type[BaseModel] = create_response_model(AnimeList, "UserListResponse")
@@ -1,7 +1,13 @@
+import asyncio
 import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from time import time
 
-import requests
+import httpx
 from fastapi import HTTPException, status
 from Crypto.Cipher import AES
 import jwt
@@ -11,6 +17,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.settings import settings
 from app.core.logger import logging
 from app.core.controllers.user import user_crud
+from app.core.http import http_client
+from app.core.cache import TTLCache
+
+TURNSTILE_URL = "https://challenges.cloudflare.com/turnstile/v0/siteverify"
+SCRYPT_PREFIX = "scrypt"
+
+TOKEN_CACHE = TTLCache(ttl=settings.token_cache_ttl, maxsize=settings.token_cache_size)
+# scrypt releases the GIL, a small dedicated pool keeps login bursts off the default executor.
+HASH_EXECUTOR = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="password-hash")
 
 UNAUTHORIZED_EXCEPTION = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -28,44 +43,99 @@ def create_access_token(data: dict) -> str:
 
 
 def encrypt_password(password: str) -> str:
+    """
+    Legacy deterministic AES-ECB hash, only used to verify passwords stored before scrypt.
+    """
     cipher = AES.new(settings.password_secret_key.encode(), AES.MODE_ECB)
     return base64.b64encode(cipher.encrypt(password.encode().rjust(32))).decode()
 
 
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32)
+
+
+def _hash_password(password: str) -> str:
+    salt = os.urandom(16)
+    n, r, p = settings.password_scrypt_n, 8, 1
+    digest = _scrypt(password, salt, n, r, p)
+    return "$".join([SCRYPT_PREFIX, str(n), str(r), str(p),
+                     base64.b64encode(salt).decode(), base64.b64encode(digest).decode()])
+
+
+def _verify_password(password: str, hashed_password: str) -> bool:
+    if not hashed_password.startswith(SCRYPT_PREFIX + "$"):
+        return hmac.compare_digest(encrypt_password(password), hashed_password)
+    _, n, r, p, salt, digest = hashed_password.split("$")
+    return hmac.compare_digest(_scrypt(password, base64.b64decode(salt), int(n), int(r), int(p)),
+                               base64.b64decode(digest))
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(HASH_EXECUTOR, _hash_password, password)
+
+
+async def verify_password(password: str, hashed_password: str | None) -> bool:
+    """
+    Check a password against a scrypt or legacy hash, without blocking the event loop.
+    A missing hash still costs one scrypt run, so unknown logins take as long as known ones.
+    """
+    if hashed_password is None:
+        await hash_password(password)
+        return False
+    return await asyncio.get_running_loop().run_in_executor(
+        HASH_EXECUTOR, _verify_password, password, hashed_password
+    )
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    return not hashed_password.startswith(f"{SCRYPT_PREFIX}${settings.password_scrypt_n}$")
+
+
 def decrypt_password(password: str) -> str:
     cipher = AES.new(settings.password_secret_key, AES.MODE_ECB)
     return cipher.decrypt(base64.b64decode(password.encode()))
 
 
-def verify_turnstile_token(token: str) -> bool:
+async def verify_turnstile_token(token: str) -> bool:
     try:
-        response = requests.post(
-            'https://challenges.cloudflare.com/turnstile/v0/siteverify',
+        response = await http_client.post(
+            TURNSTILE_URL,
             data={'secret': settings.cloudflare_turnstile_key, 'response': token}
         )
         result = response.json()
         return result.get('success', False)
-    except requests.RequestException as e:
+    except (httpx.HTTPError, ValueError) as e:
         logging.error(e, exc_info=True)
         return False
 
 
 def verify_access_token(access_token: str) -> int:
+    """
+    User id of a valid token. Verified tokens are cached until they expire,
+    for at most `settings.token_cache_ttl` seconds.
+    """
+    cached = TOKEN_CACHE.get(access_token)
+    if cached is not None:
+        id, expires_at = cached
+        if expires_at > time():
+            return id
     try:
         payload = jwt.decode(access_token, settings.password_secret_key, algorithms=["HS256"])
         id: str = payload.get("sub")
         if id is None:
             raise UNAUTHORIZED_EXCEPTION
-        return int(id)
-    except InvalidTokenError:
+        id = int(id)
+    except (InvalidTokenError, ValueError):
         raise UNAUTHORIZED_EXCEPTION
+    expires_at = payload.get("exp")
+    if expires_at is not None:
+        TOKEN_CACHE.set(access_token, (id, expires_at), ttl=min(settings.token_cache_ttl, expires_at - time()))
+    return id
 
 
 async def validate_permission(user_id: int, permission: str, session: AsyncSession):
-    user = await user_crud.get_by_id(session=session, obj_id=user_id)
-    if user is None:
-        raise UNAUTHORIZED_EXCEPTION
-    if user.role is None:
+    role = await user_crud.get_role(session=session, id=user_id)
+    if role is None:
         raise UNAUTHORIZED_EXCEPTION
-    if user.role != permission:
+    if role != permission:
         raise UNAUTHORIZED_EXCEPTION
@@ -0,0 +1,67 @@
+"""
+This module contains a fast path that serializes trusted ORM objects and rows
+following a response schema, without running Pydantic validation.
+"""
+
+from functools import cache
+from time import perf_counter
+from types import UnionType
+from typing_extensions import Any, Type, Union, get_args, get_origin
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from app.core.metrics import observe_serialization
+from app.core.settings import settings
+
+
+def _nested_model(annotation: Any) -> tuple[Type[BaseModel] | None, bool]:
+    args = get_args(annotation) if get_origin(annotation) in (Union, UnionType) else (annotation,)
+    for arg in args:
+        if get_origin(arg) is list:
+            inner = get_args(arg)[0]
+            if isinstance(inner, type) and issubclass(inner, BaseModel):
+                return inner, True
+        elif isinstance(arg, type) and issubclass(arg, BaseModel):
+            return arg, False
+    return None, False
+
+
+@cache
+def _plan(schema: Type[BaseModel]) -> list[tuple[str, str, Type[BaseModel] | None, bool]]:
+    """
+    (output key, attribute name, nested schema, is list) for every schema field.
+    """
+    return [
+        (field.alias or name, name, *_nested_model(field.annotation))
+        for name, field in schema.model_fields.items()
+    ]
+
+
+def to_jsonable(schema: Type[BaseModel], obj: Any) -> Any:
+    if obj is None:
+        return None
+    if isinstance(obj, list):
+        return [to_jsonable(schema, item) for item in obj]
+    result = {}
+    for key, attr, nested, many in _plan(schema):
+        value = obj.get(attr) if isinstance(obj, dict) else getattr(obj, attr, None)
+        if nested is not None and value is not None:
+            value = [to_jsonable(nested, item) for item in value] if many else to_jsonable(nested, value)
+        result[key] = value
+    return result
+
+
+def fast_response(schema: Type[BaseModel], data: Any) -> Any:
+    """
+    Return `data` as a ready JSON response shaped by `schema`, the route `response_model`
+    still documents it. Falls back to regular validation when `settings.fast_serialization` is off.
+    """
+    if not settings.fast_serialization:
+        return data
+    if not settings.metrics_enabled:
+        return ORJSONResponse(to_jsonable(schema, data))
+    started = perf_counter()
+    response = ORJSONResponse(to_jsonable(schema, data))
+    observe_serialization(perf_counter() - started)
+    return response
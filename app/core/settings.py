@@ -9,9 +9,22 @@ class Settings(BaseSettings):
     app_title: Annotated[str, Doc("The current project outer name")]
     app_description: Annotated[str, Doc("The current project description")]
     postgres_url: Annotated[str, Doc("Postgres url for connection.")]
+    postgres_replica_urls: Annotated[list[str], Doc("Postgres urls of read replicas for GET routes.")] = Field(default=[])
+    postgres_replica_max_lag: Annotated[float, Doc("Seconds of replay lag after which a replica is skipped.")] = Field(default=5)
+    postgres_replica_check_interval: Annotated[int, Doc("Seconds between replica lag checks.")] = Field(default=10)
+    postgres_read_after_write: Annotated[int, Doc("Seconds a client reads from the primary after a write.")] = Field(default=10)
+    postgres_pool_size: Annotated[int, Doc("Persistent connections per worker.")] = Field(default=5)
+    postgres_max_overflow: Annotated[int, Doc("Extra connections per worker under load.")] = Field(default=10)
+    postgres_pool_timeout: Annotated[float, Doc("Seconds to wait for a free connection.")] = Field(default=30)
+    postgres_pool_recycle: Annotated[int, Doc("Seconds after which a connection is replaced, -1 never.")] = Field(default=30 * 60)
+    postgres_pool_pre_ping: Annotated[bool, Doc("Ping connections on checkout, one extra round trip.")] = Field(default=True)
+    postgres_statement_cache_size: Annotated[int, Doc("Prepared statements cached per connection, 0 behind pgbouncer.")] = Field(default=100)
     cloudflare_turnstile_key: Annotated[str, Doc("Cloudflare turnstile key.")]
     password_secret_key: Annotated[str, Doc("Password secret key.")]
     http_timeout: Annotated[int, Doc("HTTP timeout.")] = Field(default=60 * 10)
+    http_client_timeout: Annotated[float, Doc("Timeout in seconds of outbound HTTP requests.")] = Field(default=10)
+    http_client_retries: Annotated[int, Doc("Retries of outbound HTTP requests.")] = Field(default=2)
+    http_client_max_connections: Annotated[int, Doc("Outbound HTTP connection pool size.")] = Field(default=100)
     client_id: Annotated[str, Doc("VK client id.")]
     secret_key: Annotated[str, Doc("VK secret key.")]
     redirect_auth_uri: Annotated[str, Doc("VK redirect auth uri.")]
@@ -20,6 +33,48 @@ class Settings(BaseSettings):
     telegram_token: Annotated[str, Doc("Telegram token.")]
     telegram_bot_id: Annotated[str, Doc("Telegram bot id.")]
     avatar_path: Annotated[str, Doc("Path to save avatar.")]
+    avatar_url: Annotated[str, Doc("Url prefix of saved avatars: the `/api/user/avatar/` route, or an absolute prefix when another host serves `avatar_path`.")] = Field(
+        default="/api/user/avatar/", pattern=r"^(https?://[^/\s]+)?/(\S*/)?$"
+    )
+    avatar_max_size: Annotated[int, Doc("Max avatar upload size in bytes.")] = Field(default=5 * 1024 * 1024)
+    avatar_chunk_size: Annotated[int, Doc("Bytes per write of avatar uploads.")] = Field(default=64 * 1024)
+    avatar_thumbnail_sizes: Annotated[list[int], Doc("Square avatar thumbnail sizes in pixels.")] = Field(default=[64, 200])
+    avatar_workers: Annotated[int, Doc("Processes rendering avatar thumbnails.")] = Field(default=1)
+    count_cache_ttl: Annotated[int, Doc("TTL in seconds of cached list totals.")] = Field(default=60)
+    cache_url: Annotated[str | None, Doc("Redis url for the response cache, needed to invalidate it across workers.")] = Field(default=None)
+    cache_ttl: Annotated[int, Doc("TTL in seconds of cached responses.")] = Field(default=300)
+    cache_memory_ttl: Annotated[int, Doc("Max TTL in seconds of the in-process response cache, the staleness other workers may serve.")] = Field(default=30)
+    cache_maxsize: Annotated[int, Doc("Max entries of the in-process response cache.")] = Field(default=4096)
+    token_cache_ttl: Annotated[int, Doc("Max seconds a verified access token stays cached.")] = Field(default=5 * 60)
+    token_cache_size: Annotated[int, Doc("Max cached verified access tokens.")] = Field(default=10000)
+    password_scrypt_n: Annotated[int, Doc("scrypt cost of password hashes, a power of two.")] = Field(default=2 ** 14)
+    password_hash_workers: Annotated[int, Doc("Threads hashing passwords.")] = Field(default=2)
+    role_cache_ttl: Annotated[int, Doc("TTL in seconds of cached user roles, the longest a revoked role keeps working.")] = Field(default=10)
+    fast_serialization: Annotated[bool, Doc("Serialize read endpoints without response validation.")] = Field(default=True)
+    bulk_chunk_size: Annotated[int, Doc("Rows per transaction of bulk upserts.")] = Field(default=500)
+    comment_notify: Annotated[bool, Doc("Share new comments between workers through Postgres NOTIFY.")] = Field(default=False)
+    comment_stream_queue_size: Annotated[int, Doc("Events a comment stream subscriber may fall behind.")] = Field(default=100)
+    comment_stream_heartbeat: Annotated[int, Doc("Seconds between keep-alive comments of idle streams.")] = Field(default=15)
+    rating_weights: Annotated[dict[str, float], Doc("Weights of the source ratings in avg_rating.")] = Field(default={
+        "kp_rating": 1.0,
+        "shikimori_rating": 1.0,
+        "anidub_rating": 1.0,
+        "myanimelist_rating": 1.0,
+        "worldart_rating": 1.0,
+    })
+    user_rating_weight: Annotated[float, Doc("Weight of the average user score in avg_rating.")] = Field(default=1.0, ge=0)
+    user_rating_min_votes: Annotated[int, Doc("User scores needed before they count in avg_rating.")] = Field(default=5)
+    rating_prior_weight: Annotated[float, Doc("Weight of the catalogue mean in avg_rating.")] = Field(default=1.0, ge=0)
+    similar_top_k: Annotated[int, Doc("Neighbours stored per anime for /similar.")] = Field(default=20)
+    similar_rebuild_interval: Annotated[int, Doc("Seconds between incremental rebuilds of similar anime.")] = Field(default=5 * 60)
+    recommendations_path: Annotated[str, Doc("File of the item-item recommendation model.")] = Field(default="recommendations.bin")
+    recommendations_neighbours: Annotated[int, Doc("Neighbours kept per anime in the recommendation model.")] = Field(default=50)
+    recommendations_min_support: Annotated[int, Doc("Lists two titles must share to be neighbours.")] = Field(default=3)
+    recommendations_rebuild_interval: Annotated[int, Doc("Seconds between rebuilds of the recommendation model.")] = Field(default=6 * 60 * 60)
+    metrics_enabled: Annotated[bool, Doc("Record request metrics and serve them on /metrics.")] = Field(default=True)
+    metrics_token: Annotated[str | None, Doc("Bearer token required by /metrics, closed when empty.")] = Field(default=None)
+    chart_refresh_interval: Annotated[int, Doc("Seconds between anime chart refreshes.")] = Field(default=60 * 60)
+    catalogue_sync_interval: Annotated[int, Doc("Seconds between resyncs of the in-process title indexes with the database.")] = Field(default=60)
 
     @property
     def api_version(self) -> Annotated[str, Doc("The current project version")]:
@@ -0,0 +1,131 @@
+"""
+This module contains the content-based model behind "similar anime".
+"""
+
+from typing_extensions import Iterable
+
+import numpy as np
+from scipy import sparse
+
+FEATURE_WEIGHTS = {"g": 1.0, "s": 1.5, "d": 1.5, "t": 0.5, "y": 0.5, "e": 0.5}
+ERA_LENGTH = 5
+# Titles scored per sparse product, bounds the dense score block to CHUNK_SIZE x titles.
+CHUNK_SIZE = 256
+
+
+def feature_tokens(
+    genres: Iterable, studios: Iterable, directors: Iterable, year: int | None, type: str | None
+) -> dict[str, float]:
+    tokens = {}
+    for prefix, ids in (("g", genres), ("s", studios), ("d", directors)):
+        for id in ids or ():
+            tokens[f"{prefix}:{id}"] = FEATURE_WEIGHTS[prefix]
+    if year:
+        tokens[f"y:{year}"] = FEATURE_WEIGHTS["y"]
+        tokens[f"e:{year // ERA_LENGTH}"] = FEATURE_WEIGHTS["e"]
+    if type:
+        tokens[f"t:{type}"] = FEATURE_WEIGHTS["t"]
+    return tokens
+
+
+class SimilarityModel:
+    """
+    TF-IDF weighted sparse feature vectors of genres, studios, directors, year and type
+    in one CSR matrix with L2-normalized rows, so the cosine similarities of a chunk of
+    titles against all others are a single sparse matrix product. The rating only breaks
+    near ties: the score is `cosine * (1 - rating_weight + rating_weight * avg_rating / 10)`.
+    """
+
+    def __init__(self, rating_weight: float = 0.1) -> None:
+        self.rating_weight = rating_weight
+        self._ids = np.empty(0, dtype=np.int64)
+        self._positions: dict[int, int] = {}
+        self._quality = np.empty(0)
+        self._matrix = sparse.csr_matrix((0, 0))
+        self._transposed = sparse.csr_matrix((0, 0))
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __contains__(self, id: int) -> bool:
+        return id in self._positions
+
+    def build(self, rows: Iterable[tuple]) -> None:
+        """
+        `rows` are (id, genre ids, studio ids, director ids, year, type, avg_rating).
+        """
+        ids, quality, indptr, columns, weights = [], [], [0], [], []
+        vocabulary: dict[str, int] = {}
+        for id, genres, studios, directors, year, type, avg_rating in rows:
+            ids.append(id)
+            quality.append(1 - self.rating_weight + self.rating_weight * min(avg_rating or 0, 10) / 10)
+            for token, weight in feature_tokens(genres, studios, directors, year, type).items():
+                columns.append(vocabulary.setdefault(token, len(vocabulary)))
+                weights.append(weight)
+            indptr.append(len(columns))
+        matrix = sparse.csr_matrix(
+            (np.array(weights, dtype=np.float64), np.array(columns, dtype=np.int64), np.array(indptr)),
+            shape=(len(ids), len(vocabulary)),
+        )
+        document_frequency = np.bincount(matrix.indices, minlength=len(vocabulary))
+        matrix = matrix @ sparse.diags(np.log1p(len(ids) / np.maximum(document_frequency, 1)))
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self._matrix = (sparse.diags(1 / norms) @ matrix).tocsr()
+        self._transposed = self._matrix.T.tocsr()
+        self._ids = np.array(ids, dtype=np.int64)
+        self._positions = {id: position for position, id in enumerate(ids)}
+        self._quality = np.array(quality)
+
+    def neighbours(self, id: int, k: int) -> list[tuple[int, float]]:
+        return self.neighbours_many([id], k).get(id, [])
+
+    def neighbours_many(self, ids: Iterable[int], k: int) -> dict[int, list[tuple[int, float]]]:
+        """
+        The `k` best (neighbour id, score) of each known id in `ids`, best first.
+        Titles sharing no feature are never neighbours.
+        """
+        positions = [self._positions[id] for id in ids if id in self._positions]
+        result = {}
+        for start in range(0, len(positions), CHUNK_SIZE):
+            chunk = positions[start:start + CHUNK_SIZE]
+            scores = (self._matrix[chunk] @ self._transposed).toarray()
+            scores *= self._quality
+            scores[np.arange(len(chunk)), chunk] = 0
+            if k < scores.shape[1]:
+                candidates = np.argpartition(-scores, k, axis=1)[:, :k]
+            else:
+                candidates = np.tile(np.arange(scores.shape[1]), (len(chunk), 1))
+            for row, position in enumerate(chunk):
+                columns = candidates[row]
+                values = scores[row, columns]
+                order = np.argsort(-values, kind="stable")
+                result[int(self._ids[position])] = [
+                    (int(self._ids[column]), round(float(value), 4))
+                    for column, value in zip(columns[order], values[order]) if value > 0
+                ]
+        return result
+
+
+def compute_neighbours(
+    rows: list[tuple], k: int, ids: list[int] | None = None, affected: Iterable[int] = ()
+) -> list[tuple[int, list[int], list[float]]]:
+    """
+    (id, neighbour ids, scores) for `ids` (all titles when None), their new neighbours
+    and `affected`. CPU bound, meant to run in a worker process.
+    """
+    model = SimilarityModel()
+    model.build(rows)
+    result = model.neighbours_many(model if ids is None else ids, k)
+    if ids is not None:
+        targets = set(affected)
+        for neighbours in result.values():
+            targets.update(other for other, _ in neighbours)
+        result.update(model.neighbours_many(targets - result.keys(), k))
+    return [
+        (id, [other for other, _ in neighbours], [score for _, score in neighbours])
+        for id, neighbours in result.items()
+    ]
@@ -0,0 +1,149 @@
+"""
+This module contains the fan-out hub behind the comment event streams.
+"""
+
+import asyncio
+from collections import defaultdict
+from typing_extensions import Coroutine
+
+import asyncpg
+import orjson
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import AsyncSessionLocal
+from app.core.logger import logging
+from app.core.models.comment import Comment
+from app.core.schemas.comment import CommentResponseBase
+from app.core.serializers import to_jsonable
+from app.core.settings import settings
+
+NOTIFY_CHANNEL = "comment_created"
+
+
+class Subscription:
+    """
+    A bounded queue of encoded events, closed when the subscriber falls `maxsize` events behind.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.queue: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=maxsize)
+        self.closed = False
+
+    def put(self, event: bytes) -> None:
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.closed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class CommentHub:
+    """
+    Per-worker fan-out of new comments to the streams of one anime. Each event is encoded
+    once and shared by all subscribers.
+
+    With `settings.comment_notify` comments are published through Postgres NOTIFY
+    and every worker dispatches them from its own LISTEN connection.
+    """
+
+    def __init__(self) -> None:
+        self._subscriptions: defaultdict[int, set[Subscription]] = defaultdict(set)
+        self._connection: asyncpg.Connection | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def subscribe(self, anime_id: int) -> Subscription:
+        subscription = Subscription(maxsize=settings.comment_stream_queue_size)
+        self._subscriptions[anime_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, anime_id: int, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(anime_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[anime_id]
+
+    async def publish(self, comment: Comment, session: AsyncSession) -> None:
+        if self._connection is None:
+            if comment.anime_id in self._subscriptions:
+                await session.refresh(comment, attribute_names=["user"])
+                self.dispatch(comment)
+            return
+        payload = f"{comment.anime_id}:{comment.id}"
+        await session.execute(select(func.pg_notify(NOTIFY_CHANNEL, payload)))
+        await session.commit()
+
+    def dispatch(self, comment: Comment) -> None:
+        subscriptions = self._subscriptions.get(comment.anime_id)
+        if not subscriptions:
+            return
+        data = orjson.dumps(to_jsonable(CommentResponseBase, comment))
+        event = b"event: comment\nid: %d\ndata: %s\n\n" % (comment.id, data)
+        for subscription in list(subscriptions):
+            subscription.put(event)
+
+    async def start(self) -> None:
+        if not settings.comment_notify:
+            return
+        url = make_url(settings.postgres_url).set(drivername="postgresql")
+        self._connection = await asyncpg.connect(url.render_as_string(hide_password=False))
+        await self._connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+        self._connection.add_termination_listener(self._on_terminate)
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.close()
+
+    def _spawn(self, coroutine: Coroutine) -> None:
+        """
+        Keep a reference to the task until it is done, the loop only holds a weak one.
+        """
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(task.exception(), exc_info=task.exception())
+
+    def _on_notify(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        anime_id, id = map(int, payload.split(":"))
+        if anime_id in self._subscriptions:
+            self._spawn(self._dispatch_by_id(id))
+
+    def _on_terminate(self, connection: asyncpg.Connection) -> None:
+        if connection is self._connection:
+            self._spawn(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        self._connection = None
+        while self._connection is None:
+            await asyncio.sleep(settings.comment_stream_heartbeat)
+            try:
+                await self.start()
+            except Exception as e:
+                logging.error(e, exc_info=True)
+
+    async def _dispatch_by_id(self, id: int) -> None:
+        try:
+            async with AsyncSessionLocal() as session:
+                comment = await session.get(Comment, id)
+            if comment is not None:
+                self.dispatch(comment)
+        except Exception as e:
+            logging.error(e, exc_info=True)
+
+
+comment_hub = CommentHub()
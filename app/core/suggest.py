@@ -0,0 +1,120 @@
+"""
+This module contains an in-memory index for search-as-you-type anime suggestions.
+"""
+
+from collections import defaultdict
+
+PREFIX_LENGTH = 2
+NGRAM_LENGTH = 3
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().replace("ё", "е").split())
+
+
+def ngrams(text: str) -> set[str]:
+    return {text[i:i + NGRAM_LENGTH] for i in range(len(text) - NGRAM_LENGTH + 1)}
+
+
+class SuggestIndex:
+    """
+    Maps word prefixes (queries shorter than three characters) and trigrams
+    (longer queries) of anime names and alternative names to anime ids.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[int, dict] = {}
+        self._texts: dict[int, list[str]] = {}
+        self._prefixes: defaultdict[str, set[int]] = defaultdict(set)
+        self._ngrams: defaultdict[str, set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(
+        self, id: int, name: str, alternative_names: list[str] | None = None, poster_small: str | None = None
+    ) -> None:
+        """
+        Add or replace an anime. The poster is kept when `poster_small` is not passed.
+        """
+        if poster_small is None and id in self._entries:
+            poster_small = self._entries[id]["poster"]["small"]
+        self.remove(id)
+        texts = [normalize(text) for text in [name, *(alternative_names or [])] if text]
+        self._entries[id] = {"id": id, "name": name, "poster": {"small": poster_small}}
+        self._texts[id] = texts
+        for index, token in self._keys(texts):
+            index[token].add(id)
+
+    def remove(self, id: int) -> None:
+        texts = self._texts.pop(id, None)
+        self._entries.pop(id, None)
+        if texts is None:
+            return
+        for index, token in self._keys(texts):
+            ids = index.get(token)
+            if ids is not None:
+                ids.discard(id)
+                if not ids:
+                    del index[token]
+
+    def sync(self, rows) -> None:
+        """
+        Make the index match `rows` of (id, name, alternative_names, poster_small),
+        touching only the titles that were added, changed or removed.
+        """
+        seen = set()
+        for id, name, alternative_names, poster_small in rows:
+            seen.add(id)
+            entry = self._entries.get(id)
+            texts = [normalize(text) for text in [name, *(alternative_names or [])] if text]
+            if entry is None or entry["name"] != name or entry["poster"]["small"] != poster_small \
+                    or self._texts[id] != texts:
+                self.remove(id)
+                self.add(id, name, alternative_names, poster_small)
+        for id in self._entries.keys() - seen:
+            self.remove(id)
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        query = normalize(query)
+        if not query:
+            return []
+        if len(query) < NGRAM_LENGTH:
+            candidates = self._prefixes.get(query, set())
+        else:
+            postings = sorted((self._ngrams.get(gram, set()) for gram in ngrams(query)), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+        ranked = []
+        for id in candidates:
+            rank = self._rank(query, self._texts[id])
+            if rank is not None:
+                ranked.append((rank, len(self._entries[id]["name"]), id))
+        ranked.sort()
+        return [self._entries[id] for *_, id in ranked[:limit]]
+
+    def _keys(self, texts: list[str]):
+        for text in texts:
+            for word in text.split():
+                for length in range(1, PREFIX_LENGTH + 1):
+                    yield self._prefixes, word[:length]
+            for gram in ngrams(text):
+                yield self._ngrams, gram
+
+    @staticmethod
+    def _rank(query: str, texts: list[str]) -> int | None:
+        """
+        0 - a name starts with the query, 1 - a word starts with it, 2 - it occurs inside a word.
+        """
+        best = None
+        for text in texts:
+            if text.startswith(query):
+                return 0
+            position = text.find(query)
+            if position == -1:
+                continue
+            rank = 1 if text[position - 1] == " " else 2
+            best = rank if best is None else min(best, rank)
+        return best
+
+
+suggest_index = SuggestIndex()
@@ -0,0 +1,121 @@
+"""
+This module contains periodic background jobs started by the app lifespan
+and one-off jobs started by admin endpoints.
+"""
+
+import asyncio
+from contextlib import nullcontext
+from typing_extensions import Callable, Coroutine
+
+from app.core.cache import response_cache
+from app.core.controllers.anime import anime_crud, SIMILAR_PENDING
+from app.core.controllers.user import user_list_crud
+from app.core.db import AsyncSessionLocal, replica_router
+from app.core.logger import logging
+from app.core.picker import random_picker
+from app.core.recommendations import recommendation_model
+from app.core.settings import settings
+from app.core.suggest import suggest_index
+
+
+# One-off jobs running in this worker by name, also keeps the loop's weak task references alive.
+RUNNING: dict[str, asyncio.Task] = {}
+
+
+def run_in_background(name: str, job: Callable[[], Coroutine]) -> bool:
+    """
+    Start `job` unless a job of that name is still running in this worker, returns whether it started.
+    """
+    task = RUNNING.get(name)
+    if task is not None and not task.done():
+        return False
+    RUNNING[name] = asyncio.create_task(job())
+    return True
+
+
+async def rebuild_similar() -> None:
+    try:
+        async with AsyncSessionLocal() as session:
+            report = await anime_crud.rebuild_similar(session=session)
+        await response_cache.invalidate("anime")
+        logging.info(f"Similar anime rebuilt: {report}")
+    except Exception as e:
+        logging.error(e, exc_info=True)
+
+
+async def rebuild_recommendations(min_interval: int | None = None) -> None:
+    """
+    List entries are read from a replica when one is healthy, the lock and the run record stay on the primary.
+    """
+    replica = replica_router.pick()
+    try:
+        async with (
+            AsyncSessionLocal() as session,
+            replica.sessionmaker() if replica is not None else nullcontext() as read_session,
+        ):
+            count = await user_list_crud.build_recommendations(
+                session=session, read_session=read_session, min_interval=min_interval
+            )
+        if count is not None:
+            recommendation_model.reload_if_changed()
+            logging.info(f"Recommendations rebuilt: {count} anime")
+    except Exception as e:
+        logging.error(e, exc_info=True)
+
+
+async def rebuild_recommendations_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.recommendations_rebuild_interval)
+        await rebuild_recommendations(min_interval=settings.recommendations_rebuild_interval)
+
+
+async def refresh_chart_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.chart_refresh_interval)
+        try:
+            async with AsyncSessionLocal() as session:
+                refreshed = await anime_crud.refresh_chart(
+                    session=session, min_interval=settings.chart_refresh_interval
+                )
+            if refreshed:
+                await response_cache.invalidate("chart")
+        except Exception as e:
+            logging.error(e, exc_info=True)
+
+
+async def rebuild_similar_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.similar_rebuild_interval)
+        if not SIMILAR_PENDING:
+            continue
+        ids = list(SIMILAR_PENDING)
+        SIMILAR_PENDING.clear()
+        try:
+            async with AsyncSessionLocal() as session:
+                await anime_crud.rebuild_similar(session=session, ids=ids)
+            await response_cache.invalidate("anime")
+        except Exception as e:
+            SIMILAR_PENDING.update(ids)
+            logging.error(e, exc_info=True)
+
+
+async def sync_catalogue_periodically() -> None:
+    """
+    Each worker keeps its own in-process indexes and updates them only for the writes it serves,
+    so titles written through other workers or directly in the database are picked up here.
+    """
+    while True:
+        await asyncio.sleep(settings.catalogue_sync_interval)
+        try:
+            async with AsyncSessionLocal() as session:
+                rows = await anime_crud.get_suggest_source(session=session)
+            suggest_index.sync(rows)
+            random_picker.sync(row.id for row in rows)
+        except Exception as e:
+            logging.error(e, exc_info=True)
+
+
+async def check_replica_lag_periodically() -> None:
+    while True:
+        await replica_router.check_lag()
+        await asyncio.sleep(settings.postgres_replica_check_interval)
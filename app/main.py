@@ -1,12 +1,65 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import ORJSONResponse
 from fastapi.routing import APIRoute
 
 from app.api.routers import main_router
+from app.api.endpoints.metrics import router as metrics_router
 from app.core.settings import settings
+from app.core.logger import logging
+from app.core.db import AsyncSessionLocal, replica_router
+from app.core.controllers.anime import anime_crud
+from app.core.suggest import suggest_index
+from app.core.picker import random_picker
+from app.core.tasks import (
+    refresh_chart_periodically,
+    rebuild_similar_periodically,
+    sync_catalogue_periodically,
+    rebuild_recommendations_periodically,
+    check_replica_lag_periodically,
+)
+from app.core.http import http_client
+from app.core.streams import comment_hub
+from app.core.recommendations import recommendation_model
+from app.core.avatars import avatar_store
+from app.core.compute import compute_pool
+from app.core.metrics import MetricsMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_client.start()
+    await comment_hub.start()
+    avatar_store.start()
+    compute_pool.start()
+    async with AsyncSessionLocal() as session:
+        rows = await anime_crud.get_suggest_source(session=session)
+    suggest_index.sync(rows)
+    random_picker.sync(row.id for row in rows)
+    recommendation_model.load(settings.recommendations_path)
+    tasks = [
+        asyncio.create_task(refresh_chart_periodically()),
+        asyncio.create_task(rebuild_similar_periodically()),
+        asyncio.create_task(sync_catalogue_periodically()),
+        asyncio.create_task(rebuild_recommendations_periodically()),
+    ]
+    if replica_router.replicas:
+        tasks.append(asyncio.create_task(check_replica_lag_periodically()))
+    yield
+    for task in tasks:
+        task.cancel()
+    await comment_hub.close()
+    avatar_store.close()
+    compute_pool.close()
+    await replica_router.close()
+    await http_client.close()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     version=settings.api_version,
     title=settings.app_title,
     description=settings.app_description,
@@ -14,14 +67,20 @@ app = FastAPI(
 )
 
 app.include_router(main_router)
+if settings.metrics_enabled:
+    app.include_router(metrics_router.router, tags=["Metrics"])
+    if not settings.metrics_token:
+        logging.warning("METRICS_TOKEN is not set, /metrics rejects every scrape")
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
-    allow_methods=["POST", "GET", "PATCH", "DELETE"],
+    allow_methods=["POST", "GET", "PUT", "PATCH", "DELETE"],
     allow_headers=["*"],
 )
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 
 
 def use_route_names_as_operation_ids(app: FastAPI) -> None:
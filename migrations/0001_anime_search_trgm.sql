@@ -0,0 +1,14 @@
+-- Trigram search over anime.name and anime.alternative_names (AnimeFilter.search).
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- array_to_string is only STABLE, an IMMUTABLE wrapper is required to index the expression.
+CREATE OR REPLACE FUNCTION anime_search_text(name varchar, alternative_names varchar[])
+RETURNS text
+LANGUAGE sql
+IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT lower(name || ' ' || coalesce(array_to_string(alternative_names, ' '), ''))
+$$;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_anime_search_trgm
+    ON anime USING gin (anime_search_text(name, alternative_names) gin_trgm_ops);
@@ -0,0 +1,13 @@
+-- Precomputed chart of released titles ranked by avg_rating (AnimeCRUD.get_chart).
+CREATE MATERIALIZED VIEW IF NOT EXISTS anime_chart AS
+SELECT anime.id AS anime_id,
+       row_number() OVER (ORDER BY rating.avg_rating DESC, anime.id) AS position,
+       rating.avg_rating
+FROM anime
+JOIN rating ON rating.anime_id = anime.id
+WHERE rating.avg_rating IS NOT NULL
+  AND anime.status = 'вышел';
+
+-- A unique index is required by REFRESH MATERIALIZED VIEW CONCURRENTLY.
+CREATE UNIQUE INDEX IF NOT EXISTS ix_anime_chart_anime_id ON anime_chart (anime_id);
+CREATE INDEX IF NOT EXISTS ix_anime_chart_position ON anime_chart (position);
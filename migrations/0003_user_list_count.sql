@@ -0,0 +1,32 @@
+-- Per-status counters of user lists, kept up to date by a trigger on user_list.
+CREATE TABLE IF NOT EXISTS user_list_count (
+    user_id integer NOT NULL REFERENCES "user" (id),
+    status varchar NOT NULL,
+    count integer NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, status)
+);
+
+CREATE OR REPLACE FUNCTION user_list_count_update() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status IS NOT NULL THEN
+        UPDATE user_list_count SET count = count - 1
+        WHERE user_id = OLD.user_id AND status = OLD.status;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status IS NOT NULL THEN
+        INSERT INTO user_list_count (user_id, status, count) VALUES (NEW.user_id, NEW.status, 1)
+        ON CONFLICT (user_id, status) DO UPDATE SET count = user_list_count.count + 1;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS user_list_count_trigger ON user_list;
+CREATE TRIGGER user_list_count_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF status ON user_list
+    FOR EACH ROW EXECUTE FUNCTION user_list_count_update();
+
+INSERT INTO user_list_count (user_id, status, count)
+SELECT user_id, status, count(*) FROM user_list WHERE status IS NOT NULL GROUP BY user_id, status
+ON CONFLICT (user_id, status) DO UPDATE SET count = EXCLUDED.count;
@@ -0,0 +1,29 @@
+-- Reply counters and keyset indexes for threaded comments (CommentCRUD.get_threads).
+ALTER TABLE comment ADD COLUMN IF NOT EXISTS reply_count integer NOT NULL DEFAULT 0;
+
+UPDATE comment SET reply_count = replies.count
+FROM (SELECT parent, count(*) AS count FROM comment WHERE parent IS NOT NULL GROUP BY parent) AS replies
+WHERE comment.id = replies.parent;
+
+CREATE OR REPLACE FUNCTION comment_reply_count_update() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' AND NEW.parent IS NOT NULL THEN
+        UPDATE comment SET reply_count = reply_count + 1 WHERE id = NEW.parent;
+    ELSIF TG_OP = 'DELETE' AND OLD.parent IS NOT NULL THEN
+        UPDATE comment SET reply_count = reply_count - 1 WHERE id = OLD.parent;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS comment_reply_count_trigger ON comment;
+CREATE TRIGGER comment_reply_count_trigger
+    AFTER INSERT OR DELETE ON comment
+    FOR EACH ROW EXECUTE FUNCTION comment_reply_count_update();
+
+CREATE INDEX IF NOT EXISTS ix_comment_threads
+    ON comment (anime_id, comment_date DESC, id DESC) WHERE parent IS NULL;
+CREATE INDEX IF NOT EXISTS ix_comment_replies
+    ON comment (parent, comment_date, id) WHERE parent IS NOT NULL;
@@ -0,0 +1,37 @@
+-- User-submitted scores and their per-anime aggregates, kept up to date by a trigger on user_rating.
+CREATE TABLE IF NOT EXISTS user_rating (
+    user_id integer NOT NULL REFERENCES "user" (id),
+    anime_id integer NOT NULL REFERENCES anime (id),
+    score smallint NOT NULL CHECK (score BETWEEN 1 AND 10),
+    PRIMARY KEY (user_id, anime_id)
+);
+
+ALTER TABLE rating ADD COLUMN IF NOT EXISTS user_rating_count integer NOT NULL DEFAULT 0;
+ALTER TABLE rating ADD COLUMN IF NOT EXISTS user_rating_sum integer NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION user_rating_aggregate_update() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE rating SET user_rating_count = user_rating_count - 1, user_rating_sum = user_rating_sum - OLD.score
+        WHERE anime_id = OLD.anime_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO rating (anime_id, user_rating_count, user_rating_sum) VALUES (NEW.anime_id, 1, NEW.score)
+        ON CONFLICT (anime_id) DO UPDATE SET
+            user_rating_count = rating.user_rating_count + 1,
+            user_rating_sum = rating.user_rating_sum + NEW.score;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS user_rating_aggregate_trigger ON user_rating;
+CREATE TRIGGER user_rating_aggregate_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF score ON user_rating
+    FOR EACH ROW EXECUTE FUNCTION user_rating_aggregate_update();
+
+UPDATE rating SET user_rating_count = votes.count, user_rating_sum = votes.sum
+FROM (SELECT anime_id, count(*) AS count, sum(score) AS sum FROM user_rating GROUP BY anime_id) AS votes
+WHERE rating.anime_id = votes.anime_id;
@@ -0,0 +1,8 @@
+-- Precomputed content-based neighbours, written by AnimeCRUD.rebuild_similar.
+CREATE TABLE IF NOT EXISTS anime_similar (
+    anime_id integer PRIMARY KEY REFERENCES anime (id) ON DELETE CASCADE,
+    similar_ids integer[] NOT NULL,
+    scores real[] NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_anime_similar_similar_ids ON anime_similar USING gin (similar_ids);
@@ -0,0 +1,5 @@
+-- Last run of periodic jobs shared by all workers, so each job runs once per interval.
+CREATE TABLE IF NOT EXISTS job_run (
+    name varchar PRIMARY KEY,
+    finished_at timestamptz NOT NULL
+);
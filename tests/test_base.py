@@ -0,0 +1,26 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.core.controllers.base import CRUDBase
+
+
+def integrity_error(detail: str | None) -> IntegrityError:
+    cause = Exception("violation")
+    cause.detail = detail
+    orig = Exception("driver error")
+    orig.__cause__ = cause
+    return IntegrityError("INSERT ...", {}, orig)
+
+
+@pytest.mark.parametrize("detail, table", [
+    ('Key (anime_id)=(100500) is not present in table "anime".', "anime"),
+    ('Key (user_id)=(7) is not present in table "user".', "user"),
+    ("Key (user_id, anime_id)=(7, 1) already exists.", None),
+    (None, None),
+])
+def test_missing_reference(detail, table):
+    assert CRUDBase.missing_reference(integrity_error(detail)) == table
+
+
+def test_missing_reference_without_a_driver_cause():
+    assert CRUDBase.missing_reference(IntegrityError("INSERT ...", {}, Exception("plain"))) is None
@@ -0,0 +1,27 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def preflight(path: str, method: str):
+    return client.options(path, headers={
+        "Origin": "https://anininja.ru",
+        "Access-Control-Request-Method": method,
+    })
+
+
+@pytest.mark.parametrize("method", ["GET", "POST", "PUT", "PATCH", "DELETE"])
+def test_preflight_allows_the_api_methods(method):
+    response = preflight("/api/user/profile/list/1", method)
+    assert response.status_code == 200
+    assert method in response.headers["access-control-allow-methods"]
+
+
+@pytest.mark.parametrize("method", ["PUT", "GET"])
+def test_preflight_allows_rating_writes(method):
+    response = preflight("/api/anime/1/rating", method)
+    assert response.status_code == 200
+    assert method in response.headers["access-control-allow-methods"]
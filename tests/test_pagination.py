@@ -0,0 +1,87 @@
+import base64
+
+import orjson
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select, Integer, Float
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+from app.core.controllers.base import CRUDBase
+from app.core.pagination import encode_cursor, decode_cursor
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Item(Base):
+    __tablename__ = "item"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    score: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+
+SCORES = [5.0, None, 3.0, 5.0, None, 1.0, 3.0, 5.0, None, 2.0]
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(Item(id=id, score=score) for id, score in enumerate(SCORES, start=1))
+        session.commit()
+        yield session
+
+
+@pytest.mark.parametrize("value", ["Naruto", 7, 8.5, None])
+def test_cursor_round_trip(value):
+    cursor = encode_cursor("year", "desc", value, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "year", "desc") == (value, 42)
+
+
+@pytest.mark.parametrize("order_by, direction", [("name", "desc"), ("year", "asc")])
+def test_cursor_of_another_ordering_is_rejected(order_by, direction):
+    cursor = encode_cursor("year", "desc", 2000, 1)
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, order_by, direction)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("payload", [
+    ["year", "desc", True, 1],
+    ["year", "desc", [2000], 1],
+    ["year", "desc", {"$gt": 0}, 1],
+    ["year", "desc", 2000, "1"],
+    ["year", "desc", 2000],
+])
+def test_tampered_cursor_is_rejected(payload):
+    cursor = base64.urlsafe_b64encode(orjson.dumps(payload)).decode()
+    with pytest.raises(HTTPException):
+        decode_cursor(cursor, "year", "desc")
+
+
+def test_garbage_cursor_is_rejected():
+    with pytest.raises(HTTPException):
+        decode_cursor("not a cursor!", "year", "desc")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("descending", [True, False])
+async def test_keyset_pages_follow_the_offset_order(session, descending):
+    crud = CRUDBase(Item)
+    expected = session.scalars(select(Item.id).order_by(*crud.sort_order(Item.score, descending))).all()
+    seen, cursor = [], None
+    while True:
+        stmt = select(Item)
+        if cursor is not None:
+            value, last_id = decode_cursor(cursor, "score", "desc")
+            stmt = await crud.keyset_constructor(stmt, Item.score, descending, value, last_id)
+        page = session.scalars(stmt.order_by(*crud.sort_order(Item.score, descending)).limit(3)).all()
+        seen.extend(item.id for item in page)
+        if len(page) < 3:
+            break
+        cursor = encode_cursor("score", "desc", page[-1].score, page[-1].id)
+    assert seen == expected
+    assert [SCORES[id - 1] for id in seen][-3:] == [None, None, None]
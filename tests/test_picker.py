@@ -0,0 +1,33 @@
+from app.core.picker import RandomPicker
+
+
+def test_add_remove_and_sample():
+    picker = RandomPicker()
+    for id in [1, 2, 3, 2]:
+        picker.add(id)
+    picker.remove(1)
+    picker.remove(10)
+    assert len(picker) == 2
+    assert sorted(picker.sample(5)) == [2, 3]
+    assert len(set(picker.sample(2))) == 2
+
+
+def test_positions_stay_consistent_after_removals():
+    picker = RandomPicker()
+    for id in range(100):
+        picker.add(id)
+    for id in range(0, 100, 3):
+        picker.remove(id)
+    assert all(picker._ids[position] == id for id, position in picker._positions.items())
+    assert sorted(picker.sample(100)) == [id for id in range(100) if id % 3]
+
+
+def test_sync():
+    picker = RandomPicker()
+    picker.sync(range(10))
+    picker.sync([3, 4, 20])
+    assert sorted(picker.sample(10)) == [3, 4, 20]
+
+
+def test_empty_picker_samples_nothing():
+    assert RandomPicker().sample(3) == []
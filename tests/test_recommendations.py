@@ -0,0 +1,83 @@
+import math
+import os
+from itertools import combinations
+
+import pytest
+
+from app.core.recommendations import RecommendationModel, build_model, item_neighbours, write_model
+
+LISTS = {
+    1: [10, 20, 30],
+    2: [10, 20, 30],
+    3: [10, 20],
+    4: [10, 20, 40],
+    5: [30, 40],
+}
+
+
+def entries() -> tuple[list[int], list[int]]:
+    pairs = [(user_id, anime_id) for user_id, anime_ids in LISTS.items() for anime_id in anime_ids]
+    # A repeated entry counts once.
+    pairs.append((1, 10))
+    return [user_id for user_id, _ in pairs], [anime_id for _, anime_id in pairs]
+
+
+def test_item_neighbours_are_list_cosines():
+    rows = item_neighbours(*entries(), k=10, min_support=1)
+    scores = {(anime_id, other_id): score for anime_id, other_id, score in rows}
+    assert scores[10, 20] == pytest.approx(4 / math.sqrt(4 * 4))
+    assert scores[10, 30] == pytest.approx(2 / math.sqrt(4 * 3))
+    assert scores[30, 40] == pytest.approx(1 / math.sqrt(3 * 2))
+    assert all(scores[a, b] == pytest.approx(scores[b, a]) for a, b in scores)
+    assert (10, 10) not in scores
+    assert [anime_id for anime_id, _, _ in rows] == sorted(anime_id for anime_id, _, _ in rows)
+    for anime_id in {anime_id for anime_id, _, _ in rows}:
+        ranked = [score for other_anime_id, _, score in rows if other_anime_id == anime_id]
+        assert ranked == sorted(ranked, reverse=True)
+
+
+def test_item_neighbours_drop_rare_pairs_and_keep_k():
+    rows = item_neighbours(*entries(), k=1, min_support=2)
+    assert [(anime_id, other_id) for anime_id, other_id, _ in rows] == [(10, 20), (20, 10), (30, 10)]
+
+
+def test_item_neighbours_of_no_entries():
+    assert item_neighbours([], [], k=5, min_support=1) == []
+
+
+def test_model_file_round_trip(tmp_path):
+    path = str(tmp_path / "recommendations.bin")
+    assert write_model(path, [(1, 2, 0.9), (1, 3, 0.5), (1, 4, 0.1), (2, 1, 0.9), (5, 3, 0.7)], k=2) == 3
+    model = RecommendationModel()
+    assert model.load(path)
+    assert len(model) == 3 and model.k == 2
+    assert model.recommend([1], limit=10) == [2, 3]
+    assert model.recommend([1, 5], limit=10) == [3, 2]
+    assert model.recommend([1, 2], limit=10) == [3]
+    assert model.recommend([7], limit=10) == []
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_build_model_and_reload(tmp_path):
+    path = str(tmp_path / "recommendations.bin")
+    model = RecommendationModel()
+    assert not model.load(path)
+    assert model.recommend([10], limit=5) == []
+    assert build_model(path, *entries(), k=5, min_support=2) == 3
+    model.reload_if_changed()
+    assert model.recommend([10], limit=5) == [20, 30]
+
+
+def test_foreign_file_is_rejected(tmp_path):
+    path = tmp_path / "recommendations.bin"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        RecommendationModel().load(str(path))
+
+
+def test_pairs_are_symmetric_for_every_list():
+    rows = item_neighbours(*entries(), k=10, min_support=1)
+    pairs = {(anime_id, other_id) for anime_id, other_id, _ in rows}
+    for anime_ids in LISTS.values():
+        for a, b in combinations(anime_ids, 2):
+            assert (a, b) in pairs and (b, a) in pairs
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
+
+from app.core.serializers import fast_response, to_jsonable
+from app.core.settings import settings
+
+
+class Poster(BaseModel):
+    small: str | None
+
+
+class Genre(BaseModel):
+    id: int
+    name: str
+
+
+class Card(BaseModel):
+    id: int
+    name: str
+    alternative_names: list[str] | None = Field(alias="alternativeNames")
+    poster: Poster | None
+    genres: list[Genre]
+
+
+def card(**kwargs) -> SimpleNamespace:
+    values = dict(
+        id=1, name="Naruto", alternative_names=["Наруто"],
+        poster=SimpleNamespace(small="a.jpg"), genres=[SimpleNamespace(id=2, name="Action")],
+    )
+    values.update(kwargs)
+    return SimpleNamespace(**values)
+
+
+def test_objects_follow_the_schema_and_its_aliases():
+    assert to_jsonable(Card, card(extra="dropped")) == {
+        "id": 1, "name": "Naruto", "alternativeNames": ["Наруто"],
+        "poster": {"small": "a.jpg"}, "genres": [{"id": 2, "name": "Action"}],
+    }
+
+
+def test_rows_dicts_lists_and_missing_values():
+    assert to_jsonable(Card, [card(alternative_names=None, poster=None, genres=[])]) == [
+        {"id": 1, "name": "Naruto", "alternativeNames": None, "poster": None, "genres": []},
+    ]
+    assert to_jsonable(Card, {"id": 2, "name": "Bleach"}) == {
+        "id": 2, "name": "Bleach", "alternativeNames": None, "poster": None, "genres": None,
+    }
+    assert to_jsonable(Card, None) is None
+
+
+def test_fast_response(monkeypatch):
+    response = fast_response(Card, [card()])
+    assert isinstance(response, ORJSONResponse)
+    assert orjson.loads(response.body)[0]["poster"] == {"small": "a.jpg"}
+    monkeypatch.setattr(settings, "metrics_enabled", False)
+    assert orjson.loads(fast_response(Card, card()).body)["id"] == 1
+
+
+def test_fast_response_falls_back_to_validation(monkeypatch):
+    monkeypatch.setattr(settings, "fast_serialization", False)
+    data = [card()]
+    assert fast_response(Card, data) is data
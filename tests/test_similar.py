@@ -0,0 +1,65 @@
+from app.core.similar import SimilarityModel, compute_neighbours, feature_tokens
+
+ROWS = [
+    (1, [1, 2], [10], [], 2004, "tv", 8.0),
+    (2, [1, 2], [10], [], 2005, "tv", 6.0),
+    (3, [1, 2], [10], [], 2005, "tv", 9.0),
+    (4, [3], [], [], 1990, "movie", None),
+    (5, [], [], [], None, None, None),
+    (6, [1], [11], [], 2020, "ova", 7.0),
+]
+
+
+def build() -> SimilarityModel:
+    model = SimilarityModel()
+    model.build(ROWS)
+    return model
+
+
+def test_feature_tokens():
+    assert feature_tokens([1], [2], [3], 2004, "tv") == {
+        "g:1": 1.0, "s:2": 1.5, "d:3": 1.5, "y:2004": 0.5, "e:400": 0.5, "t:tv": 0.5,
+    }
+    assert feature_tokens(None, None, None, None, None) == {}
+
+
+def test_neighbours_are_ranked_and_exclude_the_title_itself():
+    neighbours = build().neighbours(2, k=10)
+    assert [id for id, _ in neighbours] == [3, 1, 6]
+    scores = [score for _, score in neighbours]
+    assert scores == sorted(scores, reverse=True)
+    assert 0 < scores[-1] < scores[0] <= 1
+
+
+def test_titles_without_shared_features_are_not_neighbours():
+    model = build()
+    assert model.neighbours(4, k=10) == []
+    assert model.neighbours(5, k=10) == []
+    assert model.neighbours(100, k=10) == []
+
+
+def test_rating_breaks_ties():
+    # 1 and 3 share the same features with 2, only the rating separates them.
+    model = SimilarityModel()
+    model.build([
+        (1, [1], [], [], 2001, "tv", 5.0),
+        (2, [1], [], [], 2002, "tv", None),
+        (3, [1], [], [], 2003, "tv", 9.0),
+    ])
+    assert [id for id, _ in model.neighbours(2, k=2)] == [3, 1]
+
+
+def test_k_limits_the_neighbours():
+    assert len(build().neighbours(1, k=1)) == 1
+
+
+def test_full_build_covers_every_title():
+    result = {id: (ids, scores) for id, ids, scores in compute_neighbours(ROWS, k=2)}
+    assert result.keys() == {1, 2, 3, 4, 5, 6}
+    assert result[2][0] == [3, 1]
+    assert result[5] == ([], [])
+
+
+def test_incremental_build_adds_new_neighbours_and_affected_titles():
+    result = {id: ids for id, ids, _ in compute_neighbours(ROWS, k=1, ids=[2, 100], affected=[4])}
+    assert result == {2: [3], 3: [2], 4: []}
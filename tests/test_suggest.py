@@ -0,0 +1,69 @@
+from app.core.suggest import SuggestIndex, normalize
+
+
+def make_index() -> SuggestIndex:
+    index = SuggestIndex()
+    index.sync([
+        (1, "Naruto", ["Наруто"], "naruto.jpg"),
+        (2, "Boruto: Naruto Next Generations", None, None),
+        (3, "Ёсицунэ", None, None),
+        (4, "One Piece", ["Ван Пис"], "one-piece.jpg"),
+    ])
+    return index
+
+
+def ids(results: list[dict]) -> list[int]:
+    return [result["id"] for result in results]
+
+
+def test_normalize():
+    assert normalize("  Ёлки  ПАЛКИ ") == "елки палки"
+
+
+def test_names_starting_with_the_query_rank_first():
+    assert ids(make_index().search("naru")) == [1, 2]
+
+
+def test_short_queries_match_word_prefixes():
+    index = make_index()
+    assert ids(index.search("n")) == [1, 2]
+    assert ids(index.search("pi")) == [4]
+
+
+def test_alternative_names_and_yo_are_searchable():
+    index = make_index()
+    assert ids(index.search("ван")) == [4]
+    assert ids(index.search("есиц")) == [3]
+
+
+def test_results_carry_the_poster():
+    assert make_index().search("naruto")[0] == {"id": 1, "name": "Naruto", "poster": {"small": "naruto.jpg"}}
+
+
+def test_limit():
+    assert len(make_index().search("naru", limit=1)) == 1
+
+
+def test_add_keeps_the_poster_and_remove_drops_the_title():
+    index = make_index()
+    index.add(1, "Naruto Shippuden")
+    assert index.search("shippu")[0]["poster"] == {"small": "naruto.jpg"}
+    index.remove(1)
+    assert ids(index.search("naru")) == [2]
+    assert len(index) == 3
+
+
+def test_sync_matches_a_fresh_build():
+    index = make_index()
+    rows = [
+        (1, "Naruto", ["Наруто"], None),
+        (2, "Boruto", None, None),
+        (5, "Bleach", None, "bleach.jpg"),
+    ]
+    index.sync(rows)
+    fresh = SuggestIndex()
+    fresh.sync(rows)
+    assert index._entries == fresh._entries
+    assert index._prefixes == fresh._prefixes
+    assert index._ngrams == fresh._ngrams
+    assert index.search("naruto")[0]["poster"] == {"small": None}